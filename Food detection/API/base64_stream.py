@@ -0,0 +1,155 @@
+"""
+Streaming base64 decoding of the "image" field of a JSON request body (used by /api/detect/base64)
+"""
+import base64
+import binascii
+import json
+import re
+
+BASE64_STREAM_CHUNK = 64 * 1024
+IMAGE_KEY_SCAN_LIMIT = 64 * 1024
+
+# strings (escapes included), brackets, or an opening quote whose string is not complete yet
+JSON_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\]]|"', re.S)
+IMAGE_VALUE = re.compile(rb'\s*:\s*"')
+JSON_ESCAPE = re.compile(rb'\\(u[0-9a-fA-F]{4}|.)', re.S)
+JSON_ESCAPE_CHARS = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f'}
+NOT_BASE64 = bytes(c for c in range(256) if c not in b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=')
+
+class PayloadTooLarge(ValueError):
+    """Raised when an uploaded image exceeds the configured size limit"""
+
+def _too_large(max_bytes):
+    return PayloadTooLarge(f'Image too large: at most {max_bytes // (1024 * 1024)} MB')
+
+def _max_body_size(max_bytes, scan_limit):
+    """Largest JSON body that can still hold an image of max_bytes.
+
+    Base64 is 4/3 of the image and JSON escaping at most doubles that (\\n line breaks, \\/), so
+    this only rejects bodies early that cannot fit; the decoded size is checked exactly while decoding.
+    """
+    return max_bytes * 8 // 3 + scan_limit
+
+def _json_unescape(match):
+    escape = match.group(1)
+    if escape[:1] == b'u':
+        return chr(int(escape[1:], 16)).encode('utf8')
+    return JSON_ESCAPE_CHARS.get(escape, escape)
+
+def find_image_value(head):
+    """Offset just past the opening quote of the top-level "image" string in the start of a JSON body.
+    
+    Returns None when head does not (yet) show one: keys of nested objects and string values that
+    happen to read "image" are skipped, as json.loads(body)['image'] would.
+    """
+    depth = 0
+    for token in JSON_TOKEN.finditer(head):
+        text = token.group()
+        if text in (b'{', b'['):
+            depth += 1
+        elif text in (b'}', b']'):
+            depth -= 1
+        elif text == b'"':
+            # string continues in the next chunk
+            return None
+        elif depth == 1 and text == b'"image"':
+            value = IMAGE_VALUE.match(head, token.end())
+            if value:
+                return value.end()
+    return None
+
+def _decode_json_body(body):
+    """Image bytes of the top-level "image" string of a complete JSON body, or None"""
+    data = json.loads(body) if body.strip() else None
+    if not isinstance(data, dict) or not isinstance(data.get('image'), str):
+        return None
+    base64_string = data['image']
+    # Remove header if present
+    if ',' in base64_string:
+        base64_string = base64_string.split(',')[1]
+    return base64.b64decode(base64_string)
+
+def read_base64_image(stream, content_length=None, max_bytes=None, chunk_size=BASE64_STREAM_CHUNK,
+                      scan_limit=IMAGE_KEY_SCAN_LIMIT):
+    """Image bytes of the "image" string of a JSON request body, base64-decoded while the body is read.
+    
+    Only the decoded image is held in memory: it is written into a buffer preallocated from content_length
+    and returned as a memoryview. JSON escapes (e.g. \\/ and the \\n line breaks Android's Base64.DEFAULT
+    adds) and a data-URL header are handled. When the top-level "image" key does not start within the
+    first scan_limit bytes, the whole body is parsed with json.loads instead.
+    Returns None when the body has no "image" string.
+    Raises PayloadTooLarge as soon as the image is known to exceed max_bytes.
+    """
+    if max_bytes is not None and content_length is not None and content_length > _max_body_size(max_bytes, scan_limit):
+        raise _too_large(max_bytes)
+    
+    # Find the start of the "image" string
+    head = b''
+    start = None
+    while start is None and len(head) <= scan_limit:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        head += chunk
+        start = find_image_value(head)
+    if start is None:
+        # unusual layout (e.g. large fields before "image"): parse the whole body
+        if max_bytes is None:
+            body = head + stream.read()
+        else:
+            limit = _max_body_size(max_bytes, scan_limit)
+            body = head + stream.read(max(0, limit + 1 - len(head)))
+            if len(body) > limit:
+                raise _too_large(max_bytes)
+        image = _decode_json_body(body)
+        if image is not None and max_bytes is not None and len(image) > max_bytes:
+            raise _too_large(max_bytes)
+        return image
+    
+    capacity = content_length * 3 // 4 + 3 if content_length else chunk_size
+    if max_bytes is not None:
+        capacity = min(capacity, max_bytes + 3)
+    out = bytearray(capacity)
+    size = 0
+    escape_carry = b''   # escape sequence split across two chunks
+    quad_carry = b''     # base64 characters not yet forming a whole 4-character group
+    commas = 0
+    data = head[start:]
+    while True:
+        end = data.find(b'"')
+        done = end >= 0
+        if done:
+            data = data[:end]
+        data = escape_carry + data
+        escape_carry = b''
+        if not done:
+            cut = data.rfind(b'\\', max(0, len(data) - 6))
+            if cut >= 0 and (len(data) - cut < 2 or (data[cut + 1:cut + 2] == b'u' and len(data) - cut < 6)):
+                data, escape_carry = data[:cut], data[cut:]
+        data = JSON_ESCAPE.sub(_json_unescape, data)
+        
+        # Remove header if present: like split(',')[1], keep what lies between the first and second comma
+        while b',' in data and commas < 2:
+            before, _, after = data.partition(b',')
+            commas += 1
+            if commas == 1:
+                size, quad_carry, data = 0, b'', after
+            else:
+                data, done = before, True
+        
+        chars = quad_carry + data.translate(None, NOT_BASE64)
+        if not done:
+            whole = len(chars) - len(chars) % 4
+            chars, quad_carry = chars[:whole], chars[whole:]
+        decoded = binascii.a2b_base64(chars)
+        if max_bytes is not None and size + len(decoded) > max_bytes:
+            raise _too_large(max_bytes)
+        if size + len(decoded) > len(out):
+            out.extend(bytes(max(len(decoded), len(out))))
+        out[size:size + len(decoded)] = decoded
+        size += len(decoded)
+        if done:
+            return memoryview(out)[:size]
+        data = stream.read(chunk_size)
+        if not data:
+            raise ValueError('Unterminated "image" string in request body')
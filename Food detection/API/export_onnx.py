@@ -0,0 +1,48 @@
+"""
+One-shot export of best.pt to ONNX for the API's ONNX Runtime backend
+(set INFERENCE_BACKEND = 'onnx' in food_detection_api.py after running this)
+"""
+from ultralytics import YOLO
+import numpy as np
+import os
+
+from onnx_backend import OnnxClassifier
+
+# ============= CONFIGURATION =============
+MODEL_PATH = r"D:\college work\term5\Mobile\Food detection\best.pt"
+DYNAMIC_BATCH = True   # let the API run several images per model call
+SIMPLIFY = True        # fold constants / drop no-op nodes with onnxslim / onnx-simplifier
+MAX_PROB_DIFF = 1e-3   # largest probability difference accepted between best.pt and the API's ONNX backend
+# =========================================
+
+def export():
+    """Export MODEL_PATH next to itself as .onnx and check it predicts like the original"""
+    if not os.path.exists(MODEL_PATH):
+        print(f"❌ Model not found: {MODEL_PATH}")
+        return
+
+    model = YOLO(MODEL_PATH)
+    print(f"✓ Model: {MODEL_PATH} ({model.task}, {len(model.names)} classes)")
+    if model.task != 'classify':
+        print("⚠️  The API's ONNX backend only runs classification models")
+
+    # imgsz defaults to the size the model was trained at; names/imgsz/task go into the ONNX metadata
+    onnx_path = model.export(format='onnx', dynamic=DYNAMIC_BATCH, simplify=SIMPLIFY)
+    print(f"✓ Exported: {onnx_path}")
+
+    # Same (non-square, so the center crop matters) random BGR image through ultralytics and through
+    # the OnnxClassifier the API serves with, including its own preprocessing
+    image = np.random.default_rng(0).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    original = model.predict(source=image, verbose=False)[0]
+    if original.probs is None:
+        return
+    expected = original.probs.data.cpu().numpy()
+    served = OnnxClassifier(onnx_path).predict_probs([image])[0]
+    diff = np.abs(expected - served).max()
+    print(f"✓ Top class: {int(expected.argmax())} (pt) / {int(served.argmax())} (onnx backend), max probability difference {diff:.2e}")
+    if diff > MAX_PROB_DIFF or expected.argmax() != served.argmax():
+        print("❌ The API's ONNX backend does not match ultralytics (did its preprocessing change?)")
+        print("   Keep INFERENCE_BACKEND = 'ultralytics' until onnx_backend.classify_preprocess is updated")
+
+if __name__ == "__main__":
+    export()
@@ -1,13 +1,17 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from ultralytics import YOLO
 import cv2
 import numpy as np
 import base64
 import os
-from PIL import Image
-import io
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from base64_stream import PayloadTooLarge, read_base64_image
+import image_decode
+from image_decode import to_bgr
+from inference_batcher import InferenceBatcher, error_result, predict_uploads
+from onnx_backend import OnnxClassifier
 
 app = Flask(__name__)
 CORS(app)
@@ -16,92 +20,148 @@ CORS(app)
 MODEL_PATH = r"D:\college work\term5\Mobile\Food detection\best.pt"
 CONFIDENCE_THRESHOLD = 0.3
 TOP_K_PREDICTIONS = 3
+BATCH_MAX_SIZE = 8        # most images run through one model.predict call
+BATCH_MAX_WAIT_MS = 10    # how long an image waits for concurrent requests to join its batch
+MAX_IMAGES_PER_REQUEST = 16   # most photos accepted by /api/detect/batch
+DECODE_WORKERS = min(4, os.cpu_count() or 1)   # threads decoding the photos of a batch request
+DECODE_DRAFT = True       # let the JPEG decoder shrink large photos (1/2, 1/4, 1/8) towards the model input size
+MAX_BASE64_IMAGE_MB = 20  # largest (decoded) image accepted by /api/detect/base64
+INFERENCE_BACKEND = 'ultralytics'   # 'ultralytics' (best.pt) or 'onnx' (ONNX_MODEL_PATH on ONNX Runtime, no torch)
+ONNX_MODEL_PATH = os.path.splitext(MODEL_PATH)[0] + '.onnx'   # written by export_onnx.py
+ONNX_INTRA_OP_THREADS = os.cpu_count() or 1   # threads used inside one model call
+ONNX_INTER_OP_THREADS = 1                     # the batcher runs one model call at a time
 # =========================================
 
 # Load model at startup
 print("Loading food detection model...")
-if not os.path.exists(MODEL_PATH):
-    raise FileNotFoundError(f"Model not found at {MODEL_PATH}")
+if INFERENCE_BACKEND == 'onnx':
+    if not os.path.exists(ONNX_MODEL_PATH):
+        raise FileNotFoundError(f"ONNX model not found at {ONNX_MODEL_PATH} (create it with export_onnx.py)")
+    
+    model = OnnxClassifier(ONNX_MODEL_PATH, intra_op_threads=ONNX_INTRA_OP_THREADS, inter_op_threads=ONNX_INTER_OP_THREADS)
+else:
+    from ultralytics import YOLO
+    
+    if not os.path.exists(MODEL_PATH):
+        raise FileNotFoundError(f"Model not found at {MODEL_PATH}")
+    
+    model = YOLO(MODEL_PATH)
+print(f"✓ Model loaded successfully! ({len(model.names)} classes, {INFERENCE_BACKEND} backend)")
+
+def model_input_size():
+    """Square input size the model was trained at (what predict resizes images to)"""
+    imgsz = model.overrides.get('imgsz', 640) if isinstance(getattr(model, 'overrides', None), dict) else 640
+    if isinstance(imgsz, (list, tuple)):
+        imgsz = max(imgsz)
+    return int(imgsz)
 
-model = YOLO(MODEL_PATH)
-print(f"✓ Model loaded successfully! ({len(model.names)} classes)")
+MODEL_INPUT_SIZE = model_input_size()
+
+def classification_result(top5_indices, top5_conf):
+    """Response for one image from its five most likely classes and their probabilities"""
+    predictions = []
+    for idx, conf in zip(top5_indices, top5_conf):
+        predictions.append({
+            'food_name': model.names[int(idx)],
+            'confidence': round(float(conf) * 100, 2),
+            'class_id': int(idx)
+        })
+    
+    return {
+        'success': True,
+        'message': 'Food detected successfully',
+        'predictions': predictions[:TOP_K_PREDICTIONS],
+        'top_prediction': predictions[0] if predictions else None
+    }
+
+def format_result(result):
+    """Response for one image from its ultralytics result"""
+    # Check if we have any detections
+    if result.probs is not None:
+        # Classification model
+        return classification_result(result.probs.top5, result.probs.top5conf.cpu().numpy())
+    elif len(result.boxes) > 0:
+        # Detection model
+        predictions = []
+        for box in result.boxes:
+            class_id = int(box.cls[0])
+            confidence = float(box.conf[0])
+            class_name = model.names[class_id]
+            predictions.append({
+                'food_name': class_name,
+                'confidence': round(confidence * 100, 2),
+                'class_id': class_id
+            })
+        
+        predictions.sort(key=lambda x: x['confidence'], reverse=True)
+        
+        return {
+            'success': True,
+            'message': 'Food detected successfully',
+            'predictions': predictions[:TOP_K_PREDICTIONS],
+            'top_prediction': predictions[0] if predictions else None
+        }
+    else:
+        return {
+            'success': False,
+            'message': 'No confident predictions',
+            'predictions': []
+        }
+
+def predict_batch(images):
+    """Run inference once over several BGR images; returns one response per image"""
+    results = model.predict(
+        source=images,
+        conf=CONFIDENCE_THRESHOLD,
+        verbose=False
+    )
+    outputs = []
+    for result in results:
+        try:
+            outputs.append(format_result(result))
+        except Exception as e:
+            print(f"Error in format_result: {str(e)}")
+            traceback.print_exc()
+            outputs.append(error_result(e))
+    return outputs
+
+def predict_batch_onnx(images):
+    """predict_batch for the ONNX backend: same responses, computed from the class probabilities"""
+    probs = model.predict_probs(images)
+    # same order as ultralytics' Probs.top5 (highest probability first)
+    top5 = np.argsort(-probs, axis=1)[:, :5]
+    return [classification_result(top.tolist(), p[top]) for top, p in zip(top5, probs)]
+
+# every request's inference goes through this batcher, so the model is only ever used by its thread
+batcher = InferenceBatcher(predict_batch_onnx if INFERENCE_BACKEND == 'onnx' else predict_batch,
+                           max_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS)
+
+def decode_image(image_bytes):
+    """BGR array for an uploaded image, decoded at a reduced size when DECODE_DRAFT allows"""
+    return image_decode.decode_image(image_bytes, min_side=MODEL_INPUT_SIZE if DECODE_DRAFT else None)
+
+def decode_base64_image(base64_string):
+    """Image array for a base64 string, with or without a data-URL header"""
+    # Remove header if present
+    if ',' in base64_string:
+        base64_string = base64_string.split(',')[1]
+    return decode_image(base64.b64decode(base64_string))
+
+decode_pool = ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix='image-decode')
 
 def process_image(image_array):
     """Process image and return predictions"""
     try:
         # Make sure image is in the right format
-        if len(image_array.shape) == 2:
-            # Grayscale to BGR
-            image_array = cv2.cvtColor(image_array, cv2.COLOR_GRAY2BGR)
-        elif image_array.shape[2] == 4:
-            # RGBA to BGR
-            image_array = cv2.cvtColor(image_array, cv2.COLOR_RGBA2BGR)
+        image_array = to_bgr(image_array)
         
-        # Run inference
-        results = model.predict(
-            source=image_array,
-            conf=CONFIDENCE_THRESHOLD,
-            verbose=False
-        )
-        
-        result = results[0]
-        
-        # Check if we have any detections
-        if result.probs is not None:
-            # Classification model
-            top5_indices = result.probs.top5
-            top5_conf = result.probs.top5conf.cpu().numpy()
-            
-            predictions = []
-            for idx, conf in zip(top5_indices, top5_conf):
-                predictions.append({
-                    'food_name': model.names[int(idx)],
-                    'confidence': round(float(conf) * 100, 2),
-                    'class_id': int(idx)
-                })
-            
-            return {
-                'success': True,
-                'message': 'Food detected successfully',
-                'predictions': predictions[:TOP_K_PREDICTIONS],
-                'top_prediction': predictions[0] if predictions else None
-            }
-        elif len(result.boxes) > 0:
-            # Detection model
-            predictions = []
-            for box in result.boxes:
-                class_id = int(box.cls[0])
-                confidence = float(box.conf[0])
-                class_name = model.names[class_id]
-                predictions.append({
-                    'food_name': class_name,
-                    'confidence': round(confidence * 100, 2),
-                    'class_id': class_id
-                })
-            
-            predictions.sort(key=lambda x: x['confidence'], reverse=True)
-            
-            return {
-                'success': True,
-                'message': 'Food detected successfully',
-                'predictions': predictions[:TOP_K_PREDICTIONS],
-                'top_prediction': predictions[0] if predictions else None
-            }
-        else:
-            return {
-                'success': False,
-                'message': 'No confident predictions',
-                'predictions': []
-            }
+        # Run inference, batched with concurrent requests
+        return batcher.predict(image_array)
         
     except Exception as e:
         print(f"Error in process_image: {str(e)}")
         traceback.print_exc()
-        return {
-            'success': False,
-            'message': f'Error processing image: {str(e)}',
-            'predictions': []
-        }
+        return error_result(e)
 
 @app.route('/', methods=['GET'])
 def root():
@@ -114,6 +174,7 @@ def root():
             'health': 'GET /api/health',
             'detect': 'POST /api/detect',
             'detect_base64': 'POST /api/detect/base64',
+            'detect_batch': 'POST /api/detect/batch',
             'classes': 'GET /api/classes',
             'config': 'GET /api/config'
         }
@@ -131,7 +192,9 @@ def health_check():
         'status': 'online',
         'model_loaded': True,
         'num_classes': len(model.names),
-        'model_path': MODEL_PATH
+        'model_path': ONNX_MODEL_PATH if INFERENCE_BACKEND == 'onnx' else MODEL_PATH,
+        'backend': INFERENCE_BACKEND,
+        'batching': batcher.stats()
     })
 
 @app.route('/api/detect', methods=['POST'])
@@ -153,15 +216,7 @@ def detect_food():
             }), 400
         
         # Read image
-        image_bytes = file.read()
-        image = Image.open(io.BytesIO(image_bytes))
-        
-        # Convert to numpy array
-        image_np = np.array(image)
-        
-        # Convert RGB to BGR if needed
-        if len(image_np.shape) == 3 and image_np.shape[2] == 3:
-            image_np = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
+        image_np = decode_image(file.read())
         
         # Process
         result = process_image(image_np)
@@ -179,29 +234,24 @@ def detect_food():
 def detect_food_base64():
     """Detect food from base64 encoded image"""
     try:
-        data = request.get_json()
+        # Base64-decode while the body streams in, straight into the buffer the image decoder reads
+        try:
+            image_bytes = read_base64_image(request.stream, request.content_length,
+                                            max_bytes=MAX_BASE64_IMAGE_MB * 1024 * 1024)
+        except PayloadTooLarge as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 413
         
-        if not data or 'image' not in data:
+        if image_bytes is None:
             return jsonify({
                 'success': False,
                 'message': 'No image data provided. Send JSON with "image" field containing base64 string'
             }), 400
         
-        base64_string = data['image']
-        
-        # Remove header if present
-        if ',' in base64_string:
-            base64_string = base64_string.split(',')[1]
-        
         # Decode
-        image_bytes = base64.b64decode(base64_string)
-        image = Image.open(io.BytesIO(image_bytes))
-        
-        # Convert to numpy
-        image_np = np.array(image)
-        
-        if len(image_np.shape) == 3 and image_np.shape[2] == 3:
-            image_np = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
+        image_np = decode_image(image_bytes)
         
         # Process
         result = process_image(image_np)
@@ -215,6 +265,53 @@ def detect_food_base64():
             'message': f'Error: {str(e)}'
         }), 500
 
+@app.route('/api/detect/batch', methods=['POST'])
+def detect_food_batch():
+    """Detect food in several images (e.g. all photos of a meal) with one model call"""
+    try:
+        if request.files:
+            # multipart/form-data: any number of files under "images" (or repeated "image")
+            files = request.files.getlist('images') + request.files.getlist('image')
+            files = [f for f in files if f.filename != '']
+            sources = [f.read() for f in files]
+            decode = decode_image
+        else:
+            data = request.get_json(silent=True)
+            sources = data.get('images') if isinstance(data, dict) else None
+            if not isinstance(sources, list) or not all(isinstance(x, str) for x in sources):
+                sources = []
+            decode = decode_base64_image
+        
+        if not sources:
+            return jsonify({
+                'success': False,
+                'message': 'No images provided. Send multipart/form-data files with key "images" '
+                           'or JSON with an "images" list of base64 strings'
+            }), 400
+        
+        if len(sources) > MAX_IMAGES_PER_REQUEST:
+            return jsonify({
+                'success': False,
+                'message': f'Too many images: at most {MAX_IMAGES_PER_REQUEST} per request'
+            }), 400
+        
+        # Decode all photos concurrently, then run them through the model together
+        results = predict_uploads(batcher, sources, lambda source: to_bgr(decode(source)), decode_pool)
+        
+        return jsonify({
+            'success': any(r['success'] for r in results),
+            'count': len(results),
+            'results': results
+        }), 200
+        
+    except Exception as e:
+        print(f"Error in detect_food_batch: {str(e)}")
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'message': f'Error: {str(e)}'
+        }), 500
+
 @app.route('/api/classes', methods=['GET'])
 def get_classes():
     """Get all food classes"""
@@ -239,6 +336,12 @@ def get_config():
         'config': {
             'confidence_threshold': CONFIDENCE_THRESHOLD,
             'top_k_predictions': TOP_K_PREDICTIONS,
+            'batch_max_size': batcher.max_size,
+            'batch_max_wait_ms': batcher.max_wait_ms,
+            'decode_draft': DECODE_DRAFT,
+            'model_input_size': MODEL_INPUT_SIZE,
+            'max_base64_image_mb': MAX_BASE64_IMAGE_MB,
+            'inference_backend': INFERENCE_BACKEND,
             'num_classes': len(model.names)
         }
     })
@@ -246,7 +349,7 @@ def get_config():
 @app.route('/api/config', methods=['POST'])
 def update_config():
     """Update configuration"""
-    global CONFIDENCE_THRESHOLD, TOP_K_PREDICTIONS
+    global CONFIDENCE_THRESHOLD, TOP_K_PREDICTIONS, DECODE_DRAFT
     
     try:
         data = request.get_json()
@@ -257,12 +360,24 @@ def update_config():
         if 'top_k_predictions' in data:
             TOP_K_PREDICTIONS = int(data['top_k_predictions'])
         
+        if 'batch_max_size' in data:
+            batcher.max_size = max(1, int(data['batch_max_size']))
+        
+        if 'batch_max_wait_ms' in data:
+            batcher.max_wait_ms = max(0.0, float(data['batch_max_wait_ms']))
+        
+        if 'decode_draft' in data:
+            DECODE_DRAFT = bool(data['decode_draft'])
+        
         return jsonify({
             'success': True,
             'message': 'Configuration updated',
             'config': {
                 'confidence_threshold': CONFIDENCE_THRESHOLD,
-                'top_k_predictions': TOP_K_PREDICTIONS
+                'top_k_predictions': TOP_K_PREDICTIONS,
+                'batch_max_size': batcher.max_size,
+                'batch_max_wait_ms': batcher.max_wait_ms,
+                'decode_draft': DECODE_DRAFT
             }
         })
     except Exception as e:
@@ -284,6 +399,7 @@ def not_found(error):
             'GET /api/health': 'Health check',
             'POST /api/detect': 'Detect food (multipart)',
             'POST /api/detect/base64': 'Detect food (base64)',
+            'POST /api/detect/batch': 'Detect food in several images (multipart or base64 list)',
             'GET /api/classes': 'Get all classes',
             'GET /api/config': 'Get config',
             'POST /api/config': 'Update config'
@@ -311,14 +427,17 @@ if __name__ == '__main__':
     print("\n" + "=" * 80)
     print("🍕 FOOD DETECTION API SERVER")
     print("=" * 80)
-    print(f"\n✓ Model loaded: {MODEL_PATH}")
+    print(f"\n✓ Model loaded: {ONNX_MODEL_PATH if INFERENCE_BACKEND == 'onnx' else MODEL_PATH}")
+    print(f"✓ Inference backend: {INFERENCE_BACKEND}")
     print(f"✓ Number of food classes: {len(model.names)}")
     print(f"✓ Confidence threshold: {CONFIDENCE_THRESHOLD}")
     print(f"✓ Top predictions: {TOP_K_PREDICTIONS}")
+    print(f"✓ Batching: up to {BATCH_MAX_SIZE} images / {BATCH_MAX_WAIT_MS} ms per model call")
     print("\n📡 API Endpoints:")
     print("   GET  /api/health          - Health check")
     print("   POST /api/detect          - Detect food (multipart/form-data)")
     print("   POST /api/detect/base64   - Detect food (base64)")
+    print("   POST /api/detect/batch    - Detect food in several images at once")
     print("   GET  /api/classes         - Get all food classes")
     print("   GET  /api/config          - Get configuration")
     print("   POST /api/config          - Update configuration")
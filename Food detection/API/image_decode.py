@@ -0,0 +1,64 @@
+"""
+Decoding of uploaded images into the BGR arrays the model expects (used by food_detection_api.py)
+"""
+import cv2
+import numpy as np
+from PIL import Image
+import io
+
+# IMREAD_REDUCED_* make libjpeg scale the DCT blocks, so the full-size image is never materialized
+DRAFT_FLAGS = {1: 0, 2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+def to_bgr(image_array):
+    """Make sure image is in the 3-channel BGR format the model expects"""
+    if len(image_array.shape) == 2:
+        # Grayscale to BGR
+        image_array = cv2.cvtColor(image_array, cv2.COLOR_GRAY2BGR)
+    elif image_array.shape[2] == 4:
+        # RGBA to BGR
+        image_array = cv2.cvtColor(image_array, cv2.COLOR_RGBA2BGR)
+    return image_array
+
+def draft_scale(image_bytes, min_side):
+    """Largest JPEG decode reduction (1, 2, 4 or 8) that keeps the shorter side at least min_side"""
+    try:
+        # only parses the header, which sits in the first few KB (after EXIF and its thumbnail)
+        header = Image.open(io.BytesIO(memoryview(image_bytes)[:256 * 1024]))
+    except Exception:
+        return 1
+    if header.format != 'JPEG':
+        return 1
+    short_side = min(header.size)
+    for scale in (8, 4, 2):
+        if short_side // scale >= min_side:
+            return scale
+    return 1
+
+def decode_image_pil(image_bytes):
+    """BGR (or grayscale / RGBA) array for an encoded image, through PIL"""
+    image = Image.open(io.BytesIO(image_bytes))
+    
+    # Convert to numpy array
+    image_np = np.array(image)
+    
+    # Convert RGB to BGR if needed
+    if len(image_np.shape) == 3 and image_np.shape[2] == 3:
+        image_np = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
+    return image_np
+
+def decode_image(image_bytes, min_side=None):
+    """BGR uint8 array for an encoded image (bytes or any buffer, e.g. a memoryview).
+
+    OpenCV decodes straight from a view of the uploaded bytes into a BGR buffer (no RGB intermediate or
+    colour conversion). With min_side set, large JPEGs are decoded at a reduced size whose shorter side is
+    still at least min_side (the model input size). Formats OpenCV cannot read go through PIL.
+    """
+    buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+    # EXIF orientation is ignored, as with PIL
+    flags = cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+    if min_side:
+        flags |= DRAFT_FLAGS[draft_scale(image_bytes, min_side)]
+    image = cv2.imdecode(buffer, flags) if buffer.size else None
+    if image is None:
+        return decode_image_pil(image_bytes)
+    return image
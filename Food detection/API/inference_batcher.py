@@ -0,0 +1,128 @@
+"""
+Batching of concurrent inference requests into shared model calls (used by food_detection_api.py)
+"""
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+
+class InferenceBatcher:
+    """Groups images from concurrent requests into batched model calls.
+
+    A single worker thread owns the model: it takes the first waiting request, keeps collecting until
+    max_size images are queued or max_wait_ms has passed, runs predict_batch once over all of them and
+    hands every caller its own results. The images of one request always share a model call, even when
+    there are more than max_size of them.
+    """
+    
+    def __init__(self, predict_batch, max_size=8, max_wait_ms=10):
+        self.predict_batch = predict_batch
+        self.max_size = max_size
+        self.max_wait_ms = max_wait_ms
+        self.batches = 0
+        self.images = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+        self._thread.start()
+    
+    def submit(self, images):
+        """Queue a list of images; returns a Future for the list of their predictions"""
+        future = Future()
+        self._queue.put((list(images), future))
+        return future
+    
+    def predict(self, image):
+        """Prediction for one image, run as part of whatever batch it lands in"""
+        return self.submit([image]).result()[0]
+    
+    def predict_many(self, images):
+        """Predictions for several images, all run in the same batch"""
+        return self.submit(images).result()
+    
+    def _collect(self):
+        batch = [self._queue.get()]
+        count = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait_ms / 1000.0
+        while count < self.max_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    entry = self._queue.get(timeout=remaining)
+                else:
+                    entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if count + len(entry[0]) > self.max_size:
+                # too big to join this batch: it starts the next one
+                self._run_batch(batch)
+                batch, count = [], 0
+                deadline = time.monotonic() + self.max_wait_ms / 1000.0
+            batch.append(entry)
+            count += len(entry[0])
+        return batch
+    
+    def _run_batch(self, batch):
+        images = [image for group, _ in batch for image in group]
+        try:
+            outputs = self.predict_batch(images) if images else []
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.images += len(images)
+        start = 0
+        for group, future in batch:
+            future.set_result(outputs[start:start + len(group)])
+            start += len(group)
+    
+    def _run(self):
+        while True:
+            self._run_batch(self._collect())
+    
+    def stats(self):
+        return {
+            'max_batch_size': self.max_size,
+            'max_wait_ms': self.max_wait_ms,
+            'batches': self.batches,
+            'images': self.images,
+            'mean_batch_size': round(self.images / self.batches, 2) if self.batches else 0
+        }
+
+def error_result(e):
+    """Response for an image that could not be processed"""
+    return {
+        'success': False,
+        'message': f'Error processing image: {str(e)}',
+        'predictions': []
+    }
+
+def predict_uploads(batcher, sources, decode, executor):
+    """One response per uploaded image, all decoded images predicted in a single batcher group.
+
+    decode turns a source (file bytes or base64 string) into a model-ready image and runs on executor,
+    so photos are decoded concurrently; a photo that fails to decode only fails its own entry.
+    """
+    decoded = [executor.submit(decode, source) for source in sources]
+    results = [None] * len(sources)
+    images, positions = [], []
+    for i, future in enumerate(decoded):
+        try:
+            images.append(future.result())
+            positions.append(i)
+        except Exception as e:
+            print(f"Error decoding image {i}: {str(e)}")
+            results[i] = error_result(e)
+    
+    # One inference call for all decoded photos
+    if images:
+        try:
+            outputs = batcher.predict_many(images)
+        except Exception as e:
+            print(f"Error predicting batch: {str(e)}")
+            traceback.print_exc()
+            outputs = [error_result(e)] * len(images)
+        for i, output in zip(positions, outputs):
+            results[i] = output
+    return results
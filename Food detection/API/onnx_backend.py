@@ -0,0 +1,66 @@
+"""
+ONNX Runtime backend for the food classification model (INFERENCE_BACKEND = 'onnx' in food_detection_api.py)
+"""
+import ast
+import cv2
+import numpy as np
+
+def classify_preprocess(images, size):
+    """NCHW float32 batch for a list of BGR images, as ultralytics 8.0.200 prepares classification input.
+
+    Mirrors its CenterCrop + ToTensor: the largest centered square, resized to size x size with
+    INTER_LINEAR, BGR to RGB, scaled to 0-1. Later ultralytics versions switched to torchvision
+    Resize + CenterCrop; re-run export_onnx.py after upgrading, it compares the two backends.
+    """
+    batch = np.empty((len(images), 3, size, size), dtype=np.float32)
+    for i, image in enumerate(images):
+        h, w = image.shape[:2]
+        side = min(h, w)
+        top, left = (h - side) // 2, (w - side) // 2
+        crop = cv2.resize(image[top:top + side, left:left + side], (size, size), interpolation=cv2.INTER_LINEAR)
+        batch[i] = crop[:, :, ::-1].transpose(2, 0, 1)
+    batch /= 255.0
+    return batch
+
+class OnnxClassifier:
+    """Classification model exported by export_onnx.py, run with ONNX Runtime on CPU.
+
+    Has the attributes of ultralytics.YOLO the API reads (names, task, overrides['imgsz']) and
+    uses classify_preprocess, so predictions match the ultralytics backend (export_onnx.py checks this
+    on the exported model).
+    """
+    
+    def __init__(self, path, intra_op_threads=1, inter_op_threads=1):
+        import onnxruntime as ort
+        
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+        
+        # ultralytics stores the model's metadata in the exported file
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.task = metadata.get('task', 'classify')
+        if self.task != 'classify':
+            raise ValueError(f"ONNX backend supports classification models only (model task: {self.task})")
+        self.names = ast.literal_eval(metadata['names'])
+        
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        imgsz = ast.literal_eval(metadata['imgsz']) if 'imgsz' in metadata else model_input.shape[2:]
+        self.overrides = {'imgsz': max(imgsz) if isinstance(imgsz, (list, tuple)) else int(imgsz)}
+        # exported without dynamic=True the batch dimension is fixed at 1
+        self.max_batch = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+    
+    def preprocess(self, images):
+        """NCHW float32 batch for a list of BGR images"""
+        return classify_preprocess(images, self.overrides['imgsz'])
+    
+    def predict_probs(self, images):
+        """Class probabilities (len(images) x num_classes) for a list of BGR images"""
+        batch = self.preprocess(images)
+        step = self.max_batch or len(batch)
+        probs = [self.session.run(None, {self.input_name: batch[i:i + step]})[0] for i in range(0, len(batch), step)]
+        return np.concatenate(probs)
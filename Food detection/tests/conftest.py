@@ -0,0 +1,6 @@
+import sys
+import os
+# add the API directory to sys.path so tests can import its modules
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'API'))
+if API_DIR not in sys.path:
+    sys.path.insert(0, API_DIR)
@@ -0,0 +1,80 @@
+import base64
+import io
+import json
+import pytest
+from base64_stream import PayloadTooLarge, read_base64_image
+
+IMAGE = bytes(range(256)) * 40
+B64 = base64.b64encode(IMAGE).decode()
+
+
+def read(body, chunk_size=64 * 1024, with_length=True, **kwargs):
+    raw = body.encode() if isinstance(body, str) else body
+    out = read_base64_image(io.BytesIO(raw), len(raw) if with_length else None, chunk_size=chunk_size, **kwargs)
+    return None if out is None else bytes(out)
+
+
+def test_plain_and_data_url():
+    assert read(json.dumps({'image': B64})) == IMAGE
+    assert read(json.dumps({'image': 'data:image/jpeg;base64,' + B64})) == IMAGE
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 64])
+def test_escapes_and_header_split_across_chunks(chunk_size):
+    # Android Base64.DEFAULT line breaks, escaped slashes and Gson's = for '='
+    wrapped = '\n'.join(B64[i:i + 76] for i in range(0, len(B64), 76))
+    body = json.dumps({'image': 'data:image/png;base64,' + wrapped}).replace('/', '\\/').replace('=', '\\u003d')
+    for pad in range(chunk_size):
+        assert read(' ' * pad + body, chunk_size=chunk_size) == IMAGE
+        assert read(' ' * pad + body, chunk_size=chunk_size, with_length=False) == IMAGE
+
+
+def test_key_after_scan_limit_falls_back_to_json():
+    body = json.dumps({'pad': 'x' * 140000, 'image': B64})
+    assert read(body, scan_limit=64 * 1024) == IMAGE
+    assert read(body, chunk_size=1000, scan_limit=5000, with_length=False) == IMAGE
+
+
+def test_only_top_level_image_key():
+    hello = base64.b64encode(b'hello').decode()
+    assert read(json.dumps({'meta': {'image': hello}, 'image': B64})) == IMAGE
+    assert read(json.dumps({'note': '"image": "' + hello + '"', 'image': B64})) == IMAGE
+    assert read(json.dumps({'images': [{'image': hello}], 'image': B64}), chunk_size=4) == IMAGE
+    assert read(json.dumps({'meta': {'image': hello}})) is None
+    assert read(json.dumps({'img': B64})) is None
+    assert read('') is None
+
+
+def test_payload_too_large():
+    big = base64.b64encode(bytes(3 * 1024 * 1024)).decode()
+    body = json.dumps({'image': big})
+    # rejected up front from Content-Length, and while streaming without one
+    with pytest.raises(PayloadTooLarge):
+        read(body, max_bytes=1024 * 1024)
+    with pytest.raises(PayloadTooLarge):
+        read(body, max_bytes=1024 * 1024, with_length=False)
+    assert len(read(body, max_bytes=4 * 1024 * 1024)) == 3 * 1024 * 1024
+
+
+def test_unterminated_string():
+    with pytest.raises(ValueError):
+        read('{"image": "QUJD')
+
+
+def test_wrapped_base64_just_under_the_limit():
+    max_bytes = 1024 * 1024
+    image = bytes(range(256)) * (max_bytes // 256 - 1)
+    encoded = base64.b64encode(image).decode()
+    # Android's Base64.DEFAULT: a line break every 76 characters, sent as an escaped \n in JSON
+    wrapped = '\n'.join(encoded[i:i + 76] for i in range(0, len(encoded), 76))
+    body = json.dumps({'image': wrapped}).replace('/', '\\/')
+    # more than the 4/3 base64 overhead alone allows for
+    assert len(body) > max_bytes * 4 // 3 + 1000
+    assert read(body, max_bytes=max_bytes, scan_limit=1000) == image
+    assert read(body, max_bytes=max_bytes, with_length=False, scan_limit=1000) == image
+    assert read(' ' * 100000 + body, max_bytes=max_bytes, scan_limit=1000) == image
+    with pytest.raises(PayloadTooLarge):
+        read(body, max_bytes=len(image) - 1, scan_limit=1000)
+    with pytest.raises(PayloadTooLarge):
+        read(' ' * 100000 + body, max_bytes=len(image) - 1, scan_limit=1000)
+
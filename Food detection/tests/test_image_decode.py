@@ -0,0 +1,73 @@
+import io
+import numpy as np
+import pytest
+from PIL import Image
+from image_decode import decode_image, decode_image_pil, draft_scale, to_bgr
+
+IMGSZ = 64
+
+
+def encode(size, fmt='JPEG', mode='RGB'):
+    # smooth gradient plus noise, so the JPEG has real detail to decode
+    w, h = size
+    rng = np.random.default_rng(0)
+    base = np.add.outer(np.arange(h), np.arange(w)) % 256
+    pixels = np.dstack([base, base[::-1], base[:, ::-1]]).astype(np.int16) + rng.integers(-20, 20, (h, w, 3))
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    if mode != 'RGB':
+        image = image.convert(mode)
+    buf = io.BytesIO()
+    image.save(buf, fmt)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize('short_side,scale', [
+    (8 * IMGSZ, 8), (8 * IMGSZ - 1, 4),
+    (4 * IMGSZ, 4), (4 * IMGSZ - 1, 2),
+    (2 * IMGSZ, 2), (2 * IMGSZ - 1, 1),
+    (IMGSZ - 1, 1),
+])
+def test_draft_scale_boundaries(short_side, scale):
+    data = encode((short_side + 37, short_side))
+    assert draft_scale(data, IMGSZ) == scale
+    image = decode_image(data, min_side=IMGSZ)
+    # the reduced decode never goes below the model input size (unless the photo already is smaller)
+    assert min(image.shape[:2]) >= min(short_side, IMGSZ)
+    assert min(image.shape[:2]) == -(-short_side // scale)
+
+
+def test_draft_scale_ignores_non_jpeg_and_garbage():
+    assert draft_scale(encode((1000, 800), 'PNG'), IMGSZ) == 1
+    assert draft_scale(b'not an image', IMGSZ) == 1
+    assert decode_image(encode((1000, 800), 'PNG'), min_side=IMGSZ).shape == (800, 1000, 3)
+
+
+def test_full_size_decode_matches_pil():
+    data = encode((301, 203))
+    assert np.array_equal(decode_image(data), decode_image_pil(data))
+    assert np.array_equal(decode_image(memoryview(data)), decode_image_pil(data))
+
+
+def test_png_decode_matches_pil():
+    data = encode((120, 80), 'PNG')
+    assert np.array_equal(decode_image(data), decode_image_pil(data))
+
+
+def test_formats_opencv_cannot_read_fall_back_to_pil():
+    # OpenCV has no PCX decoder
+    data = encode((40, 30), 'PCX')
+    assert np.array_equal(decode_image(data, min_side=IMGSZ), decode_image_pil(data))
+    with pytest.raises(Exception):
+        decode_image(b'not an image')
+    with pytest.raises(Exception):
+        decode_image(b'')
+
+
+def test_to_bgr():
+    gray = decode_image_pil(encode((20, 10), 'PNG', mode='L'))
+    assert gray.shape == (10, 20)
+    assert to_bgr(gray).shape == (10, 20, 3)
+    rgba = decode_image_pil(encode((20, 10), 'PNG', mode='RGBA'))
+    bgr = to_bgr(rgba)
+    assert bgr.shape == (10, 20, 3)
+    assert np.array_equal(bgr[..., ::-1], rgba[..., :3])
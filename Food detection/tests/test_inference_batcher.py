@@ -0,0 +1,147 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from inference_batcher import InferenceBatcher, error_result, predict_uploads
+
+
+class FakeModel:
+    """predict_batch stand-in that records the size of every call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, images):
+        self.calls.append(len(images))
+        return [f'out-{image}' for image in images]
+
+
+def test_concurrent_predicts_share_one_call():
+    model = FakeModel()
+    # the wait is long enough that only a full batch can explain a quick answer
+    batcher = InferenceBatcher(model, max_size=4, max_wait_ms=5000)
+    results = {}
+
+    def predict(i):
+        results[i] = batcher.predict(i)
+
+    threads = [threading.Thread(target=predict, args=(i,)) for i in range(4)]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert time.monotonic() - start < 2
+    assert model.calls == [4]
+    assert results == {i: f'out-{i}' for i in range(4)}
+    assert batcher.stats()['batches'] == 1 and batcher.stats()['images'] == 4
+
+
+def test_max_wait_bounds_a_lone_predict():
+    model = FakeModel()
+    batcher = InferenceBatcher(model, max_size=8, max_wait_ms=50)
+    start = time.monotonic()
+    assert batcher.predict('a') == 'out-a'
+    elapsed = time.monotonic() - start
+    # waits for company for max_wait_ms, then runs alone
+    assert 0.04 <= elapsed < 0.5
+    assert model.calls == [1]
+
+
+class BlockingModel(FakeModel):
+    """FakeModel whose first call waits for release(), so later requests queue up behind it"""
+
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+        self.started = threading.Event()
+        self._release = threading.Event()
+
+    def release(self):
+        self._release.set()
+
+    def __call__(self, images):
+        if not self.calls:
+            self.started.set()
+            self._release.wait(5)
+            return super().__call__(images)
+        if self.fail:
+            self.calls.append(len(images))
+            raise RuntimeError('model failed')
+        return super().__call__(images)
+
+
+def test_groups_of_mixed_sizes_get_their_own_outputs():
+    model = BlockingModel()
+    batcher = InferenceBatcher(model, max_size=8, max_wait_ms=100)
+    first = batcher.submit(['warmup'])
+    model.started.wait(5)
+    futures = [batcher.submit([f'{g}-{i}' for i in range(size)]) for g, size in enumerate([2, 3, 1])]
+    model.release()
+    assert first.result(5) == ['out-warmup']
+    assert [f.result(5) for f in futures] == [['out-0-0', 'out-0-1'], ['out-1-0', 'out-1-1', 'out-1-2'], ['out-2-0']]
+    # the three groups shared one call
+    assert model.calls == [1, 6]
+
+
+def test_a_group_larger_than_max_size_is_never_split():
+    model = FakeModel()
+    batcher = InferenceBatcher(model, max_size=8, max_wait_ms=10)
+    images = list(range(16))
+    assert batcher.predict_many(images) == [f'out-{i}' for i in images]
+    assert model.calls == [16]
+
+
+def test_predict_batch_error_reaches_every_future_in_the_batch():
+    model = BlockingModel(fail=True)
+    batcher = InferenceBatcher(model, max_size=8, max_wait_ms=100)
+    batcher.submit(['warmup'])
+    model.started.wait(5)
+    futures = [batcher.submit(['a']), batcher.submit(['b', 'c'])]
+    model.release()
+    for future in futures:
+        with pytest.raises(RuntimeError, match='model failed'):
+            future.result(5)
+    assert model.calls == [1, 3]
+
+
+def test_overflowing_group_starts_a_batch_with_a_fresh_wait():
+    finished = {}
+
+    def slow_model(images):
+        if images[0] == 'a':
+            # the first batch outlives the wait it was collected under
+            time.sleep(0.3)
+        finished[images[0]] = time.monotonic()
+        return list(images)
+
+    batcher = InferenceBatcher(slow_model, max_size=4, max_wait_ms=150)
+    blocker = BlockingModel()
+    # hold the worker so both groups are queued when collection starts
+    batcher.predict_batch = blocker
+    batcher.submit(['warmup'])
+    blocker.started.wait(5)
+    batcher.predict_batch = slow_model
+    a = batcher.submit(['a', 'a', 'a'])
+    b = batcher.submit(['b', 'b', 'b'])
+    blocker.release()
+    assert a.result(5) == ['a'] * 3 and b.result(5) == ['b'] * 3
+    # b waited its own max_wait_ms for company after a's batch ran, instead of a's expired deadline
+    assert finished['b'] - finished['a'] >= 0.13
+
+
+def test_photo_that_fails_to_decode_only_fails_its_entry():
+    model = FakeModel()
+    batcher = InferenceBatcher(model, max_size=8, max_wait_ms=10)
+
+    def decode(source):
+        if source == 'bad':
+            raise ValueError('cannot identify image file')
+        return source.upper()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = predict_uploads(batcher, ['x', 'bad', 'y'], decode, pool)
+    assert results[0] == 'out-X' and results[2] == 'out-Y'
+    assert results[1] == error_result(ValueError('cannot identify image file'))
+    assert results[1]['success'] is False
+    assert model.calls == [2]
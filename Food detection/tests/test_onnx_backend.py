@@ -0,0 +1,30 @@
+import numpy as np
+from onnx_backend import classify_preprocess
+
+
+def test_center_crop_and_channel_order():
+    # 4 x 8 BGR image whose columns are numbered; the centered 4 x 4 square is columns 2-5
+    image = np.zeros((4, 8, 3), dtype=np.uint8)
+    image[:, :, 0] = np.arange(8) * 10          # B
+    image[:, :, 1] = 100                        # G
+    image[:, :, 2] = 200 + np.arange(4)[:, None]  # R
+    batch = classify_preprocess([image], 4)
+    assert batch.shape == (1, 3, 4, 4) and batch.dtype == np.float32
+    # channels come out as R, G, B, scaled to 0-1
+    assert np.allclose(batch[0, 0], (200 + np.arange(4)[:, None]) * np.ones((1, 4)) / 255.0)
+    assert np.allclose(batch[0, 1], 100 / 255.0)
+    assert np.allclose(batch[0, 2], np.tile(np.arange(2, 6) * 10, (4, 1)) / 255.0)
+
+
+def test_tall_image_crop_offset_and_resize():
+    # 11 x 8 image: the square is rows 1-8 ((11 - 8) // 2 = 1); row 0 and rows 9-10 are cropped away
+    image = np.full((11, 8, 3), 255, dtype=np.uint8)
+    square = np.kron(np.array([[0, 40], [80, 120]], dtype=np.uint8), np.ones((4, 4), dtype=np.uint8))
+    image[1:9] = square[:, :, None]
+    batch = classify_preprocess([image, image[:, :, ::-1].copy()], 2)
+    assert batch.shape == (2, 3, 2, 2)
+    # halving a block-constant image with INTER_LINEAR keeps each 4 x 4 block's value
+    expected = np.array([[0, 40], [80, 120]]) / 255.0
+    for c in range(3):
+        assert np.allclose(batch[0, c], expected)
+        assert np.allclose(batch[1, c], expected)
@@ -0,0 +1,48 @@
+"""
+Patient feature matrix shared by training and prediction.
+"""
+from typing import Dict
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.preprocess import compute_daily_needs
+
+NUMERIC_FEATURES = ['Age', 'Weight_kg', 'Height_cm', 'BMI', 'Weekly_Exercise_Hours', 'Adherence_to_Diet_Plan', 'Dietary_Nutrient_Imbalance_Score', 'target_calories']
+CATEGORICAL_FEATURES = ['Gender', 'Disease_Type', 'Physical_Activity_Level']
+
+
+def category_codes(encoder) -> Dict[str, int]:
+    """Category -> code lookup equivalent to a fitted LabelEncoder's transform"""
+    return {str(cls): i for i, cls in enumerate(encoder.classes_)}
+
+
+def encode_categories(df: pd.DataFrame, encoders) -> pd.DataFrame:
+    """<name>_enc column per encoder; values are compared as str() and unseen ones map to 0"""
+    out = {}
+    for name, enc in encoders.items():
+        if name in df.columns:
+            values = df[name].map(str)
+        else:
+            values = pd.Series('', index=df.index)
+        out[name + '_enc'] = values.map(category_codes(enc)).fillna(0).astype(np.int64)
+    return pd.DataFrame(out, index=df.index)
+
+
+def featurize_batch(patients: pd.DataFrame, feature_cols, encoders) -> pd.DataFrame:
+    """Feature matrix (one row per patient, in order) for the trained model.
+
+    Same values as building the features patient by patient: daily needs are recomputed, missing numeric
+    columns become 0 and categories the encoders never saw become 0.
+    """
+    if len(patients) == 0:
+        return pd.DataFrame(columns=feature_cols)
+    p = compute_daily_needs(patients.reset_index(drop=True))
+    X = {}
+    for c in NUMERIC_FEATURES:
+        X[c] = pd.to_numeric(p[c]).astype(float) if c in p.columns else np.zeros(len(p))
+    X = pd.DataFrame(X, index=p.index)
+    X = X.join(encode_categories(p, encoders))
+    return X[feature_cols]
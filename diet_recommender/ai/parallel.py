@@ -0,0 +1,175 @@
+"""
+Process-pool execution of recommend_top_n + make_30_day_plan.
+
+Worker processes attach to the numeric recipe columns through multiprocessing.shared_memory instead of
+receiving a pickled DataFrame with every task. The parent resolves everything that needs recipe text
+(allergen mask, cuisine match, diet-label boost) from caches on the catalog and sends only per-recipe
+vectors; the worker scores, takes the top N and plans, and returns catalog row positions per day.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ai.recommend import score_arrays, cuisine_match_mask, target_carbs_pct_for, catalog_diet_label_boosts, catalog_token_index
+from ai.planner import plan_positions
+
+# shared array name -> catalog column
+SHARED_COLUMNS = {
+    'calories': 'calories',
+    'protein': 'Protein(g)',
+    'carbs': 'Carbs(g)',
+    'fat': 'Fat(g)',
+}
+
+
+class SharedCatalogArrays:
+    """Numeric columns of one RecipeCatalog, plus recipe-name sort codes, copied into shared memory blocks.
+
+    spec is the small picklable description workers use to attach to the blocks.
+    """
+
+    def __init__(self, catalog):
+        frame = catalog.frame
+        arrays = {}
+        for key, col in SHARED_COLUMNS.items():
+            arrays[key] = frame[col].to_numpy(dtype=float) if col in frame.columns else np.zeros(len(frame))
+        # codes sort like the names (what the planner's tie-break needs); -1 marks a missing name
+        names = frame['Recipe_name'] if 'Recipe_name' in frame.columns else pd.Series([None] * len(frame))
+        arrays['name_code'] = pd.factorize(names, sort=True)[0].astype(np.int64)
+
+        self.blocks = {}
+        self.spec = {'version': catalog.version, 'size': len(frame), 'arrays': {}}
+        try:
+            for key, arr in arrays.items():
+                shm = shared_memory.SharedMemory(create=True, size=max(1, arr.nbytes))
+                self.blocks[key] = shm
+                view = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+                view[:] = arr
+                del view
+                self.spec['arrays'][key] = (shm.name, arr.dtype.str, len(arr))
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        for shm in self.blocks.values():
+            try:
+                shm.close()
+                shm.unlink()
+            except Exception:
+                pass
+        self.blocks = {}
+
+
+# worker-side: catalog version -> (blocks, arrays) of the attached shared memory
+_attached = {}
+
+
+def _attached_arrays(spec):
+    entry = _attached.get(spec['version'])
+    if entry is None:
+        # a new catalog version supersedes whatever this worker attached before
+        for version in list(_attached):
+            blocks, arrays = _attached.pop(version)
+            arrays.clear()
+            for shm in blocks.values():
+                try:
+                    shm.close()
+                except Exception:
+                    pass
+        blocks, arrays = {}, {}
+        for key, (name, dtype, size) in spec['arrays'].items():
+            shm = shared_memory.SharedMemory(name=name)
+            blocks[key] = shm
+            arrays[key] = np.ndarray((size,), dtype=np.dtype(dtype), buffer=shm.buf)
+        entry = _attached[spec['version']] = (blocks, arrays)
+    return entry[1]
+
+
+def recommend_and_plan_task(spec, excluded_bits, cuisine_bits, boosts, meal_cal, target_carbs_pct, n, per_meal, days, meals_per_day, no_repeat_within_days, seed=0) -> List[List[int]]:
+    """Worker body: same selection as recommend_top_n followed by make_30_day_plan, on shared arrays.
+
+    Returns the catalog row positions picked for each day.
+    """
+    arrays = _attached_arrays(spec)
+    size = spec['size']
+    excluded = np.unpackbits(excluded_bits, count=size).astype(bool)
+    cuisine = np.unpackbits(cuisine_bits, count=size).astype(bool)
+
+    cand = np.flatnonzero(~excluded)
+    scores = score_arrays(arrays['calories'][cand], arrays['protein'][cand], arrays['carbs'][cand], arrays['fat'][cand],
+                          cuisine[cand], meal_cal, target_carbs_pct) * boosts[cand]
+    # identical ordering to recommend_top_n's sort_values('score', ascending=False, kind='stable').head(n)
+    top = cand[pd.Series(scores).sort_values(ascending=False, kind='stable').head(n).index.to_numpy()]
+
+    pool = top[arrays['name_code'][top] >= 0]
+    picks = plan_positions(arrays['calories'][pool], arrays['name_code'][pool], per_meal, days=days,
+                           meals_per_day=meals_per_day, no_repeat_within_days=no_repeat_within_days, seed=seed)
+    return [pool[day].tolist() for day in picks]
+
+
+class PlanningProcessPool:
+    """Runs recommend_top_n + make_30_day_plan for a catalog in a pool of worker processes.
+
+    The shared arrays follow catalog reloads; the previous generation is kept until the next reload so
+    tasks submitted just before a swap can still attach.
+    """
+
+    def __init__(self, processes: int = None):
+        self.processes = processes
+        self._executor = None
+        self._shared = []
+        self._lock = threading.Lock()
+
+    def _start(self, catalog):
+        """Executor and shared arrays for catalog, starting the pool / exporting the catalog if needed"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context('spawn'))
+            if not self._shared or self._shared[-1].spec['version'] != catalog.version:
+                self._shared.append(SharedCatalogArrays(catalog))
+                while len(self._shared) > 2:
+                    self._shared.pop(0).close()
+            return self._executor, self._shared[-1]
+
+    def plan_rows(self, catalog, patient: pd.Series, diet_label_probs=None, n: int = 500, days: int = 30, meals_per_day: int = 3, no_repeat_within_days: int = 7, seed: int = 0, score_meals_per_day: int = 3) -> List[List[int]]:
+        """Equivalent of recommend_top_n(catalog.frame, ...) -> filter -> make_30_day_plan, returning the
+        catalog.frame row positions picked for each day.
+
+        score_meals_per_day: meals_per_day used for the per-meal calorie target when scoring, which is
+                             recommend_top_n's own argument (the API leaves it at its default of 3)
+        """
+        executor, shared = self._start(catalog)
+        excluded = catalog_token_index(catalog).exclusion_mask(patient)
+        cuisine = cuisine_match_mask(catalog.frame, patient)
+        boosts = catalog_diet_label_boosts(catalog, diet_label_probs)
+        meal_cal = patient.get('target_calories', 2000) / float(score_meals_per_day)
+        per_meal = float(patient.get('target_calories', 2000)) / meals_per_day
+
+        future = executor.submit(
+            recommend_and_plan_task, shared.spec, np.packbits(excluded), np.packbits(cuisine), boosts,
+            meal_cal, target_carbs_pct_for(patient), n, per_meal, days, meals_per_day, no_repeat_within_days, seed,
+        )
+        return future.result()
+
+    def recommend_and_plan(self, catalog, patient: pd.Series, diet_label_probs=None, n: int = 500, days: int = 30, meals_per_day: int = 3, no_repeat_within_days: int = 7, seed: int = 0, score_meals_per_day: int = 3) -> List[pd.DataFrame]:
+        """plan_rows as day frames"""
+        rows = self.plan_rows(catalog, patient, diet_label_probs=diet_label_probs, n=n, days=days, meals_per_day=meals_per_day,
+                              no_repeat_within_days=no_repeat_within_days, seed=seed, score_meals_per_day=score_meals_per_day)
+        return [catalog.frame.iloc[day] for day in rows]
+
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+            for shared in self._shared:
+                shared.close()
+            self._shared = []
@@ -1,65 +1,140 @@
-from typing import List
+from typing import Iterator, List, NamedTuple, Tuple
+import random
 import pandas as pd
 import numpy as np
 
 
-def make_30_day_plan(recipes: pd.DataFrame, patient: pd.Series, days: int = 30, meals_per_day: int = 3, no_repeat_within_days: int = 7, seed: int = 0) -> List[pd.DataFrame]:
-    """Make a multi-day plan from candidate recipes.
+def best_band(scores: np.ndarray, candidates: np.ndarray, tolerance: float = 1.05, tie_keys: np.ndarray = None) -> np.ndarray:
+    """Candidates whose score is within tolerance x the best (lowest) score, best first.
 
-    no_repeat_within_days: do not repeat the same recipe within this many days (soft constraint enforced by blocking recent picks)
-    seed: for deterministic selection when scores tie
+    Finds the minimum with argpartition and the band with a threshold scan, so only the band itself is
+    sorted - by (score, tie_keys, position) - instead of the whole pool.
+    scores: score per row (lower is better, no NaN among candidates)
+    candidates: row positions to choose from
     """
-    import random
-    random.seed(seed)
+    cand_scores = scores[candidates]
+    best = cand_scores[np.argpartition(cand_scores, 0)[0]]
+    band = candidates[cand_scores <= best * tolerance]
+    if tie_keys is None:
+        return band[np.lexsort((band, scores[band]))]
+    return band[np.lexsort((band, tie_keys[band], scores[band]))]
 
-    target = float(patient.get('target_calories', 2000))
-    per_meal = target / meals_per_day
 
-    pool = recipes.copy()
-    pool = pool.dropna(subset=['Recipe_name'])
+def iter_plan_positions(calories: np.ndarray, name_codes: np.ndarray, per_meal: float, days: int = 30, meals_per_day: int = 3, no_repeat_within_days: int = 7, seed: int = 0) -> Iterator[List[int]]:
+    """Greedy planner core over plain arrays; yields the picked row positions of each day as soon as it is planned.
 
-    plans = []
-    # track last day used index of each recipe_name
-    last_used_day = {}
+    calories: calories per candidate row
+    name_codes: integer code per row such that codes sort like the recipe names (pd.factorize(names, sort=True));
+                rows sharing a code are the same recipe
+    The selection rule is the one make_30_day_plan always used: the weighted score is the calorie gap to the
+    per-meal target times a repeat penalty (1 + days left in the no-repeat window), and one of the rows within
+    5% of the best score is picked at random, ties ordered by (score, name, position).
+    """
+    rng = random.Random(seed)
+    n = len(calories)
+    # the calorie gap does not change during planning, only the repeat penalty does
+    abs_diff = np.abs(np.asarray(calories, dtype=float) - per_meal)
+    name_codes = np.asarray(name_codes)
+    n_names = int(name_codes.max()) + 1 if n else 0
+    # last day each recipe was used; far in the past for recipes never picked
+    last_used = np.full(n_names, -(days + no_repeat_within_days + 1), dtype=np.int64)
+    positions = np.arange(n)
 
     for d in range(days):
+        days_since = d - last_used[name_codes]
+        penalty = np.where(days_since < no_repeat_within_days, 1 + (no_repeat_within_days - days_since), 1)
+        weighted = abs_diff * penalty
+        available = np.ones(n, dtype=bool)
         day_picks = []
-        # create a fresh candidate pool for the day's selection
-        day_pool = pool.copy()
         for m in range(meals_per_day):
-            if day_pool.empty:
+            if not available.any():
                 break
-            day_pool = day_pool.copy()
-            # score by absolute difference
-            day_pool['abs_diff'] = (day_pool['calories'] - per_meal).abs()
-            # penalize if used within recent days
-            def recent_penalty(r):
-                name = r if isinstance(r, str) else str(r)
-                if name in last_used_day:
-                    days_since = d - last_used_day[name]
-                    if days_since < no_repeat_within_days:
-                        return 1 + (no_repeat_within_days - days_since)  # larger penalty the more recent
-                return 1
-
-            day_pool['repeat_penalty'] = day_pool['Recipe_name'].map(recent_penalty)
-            day_pool['weighted_score'] = day_pool['abs_diff'] * day_pool['repeat_penalty']
-            day_pool = day_pool.sort_values(['weighted_score', 'Recipe_name'])
-            # pick top candidate; break ties by random choice among top-k close ones
-            best_score = day_pool['weighted_score'].iloc[0]
-            topk = day_pool[day_pool['weighted_score'] <= best_score * 1.05]
-            if len(topk) > 1:
-                pick_idx = random.choice(list(topk.index))
-                pick = day_pool.loc[pick_idx]
+            valid = available & ~np.isnan(weighted)
+            if valid.any():
+                band = best_band(weighted, positions[valid], tolerance=1.05, tie_keys=name_codes)
             else:
-                pick = day_pool.iloc[0]
-
+                # only NaN scores left: they sort last, by name
+                cand = positions[available]
+                band = cand[np.lexsort((cand, name_codes[cand]))][:1]
+            # pick top candidate; break ties by random choice among top-k close ones
+            pick = int(rng.choice(band)) if len(band) > 1 else int(band[0])
             day_picks.append(pick)
-            last_used_day[pick['Recipe_name']] = d
-            # remove chosen recipe from day_pool for remaining meals
-            day_pool = day_pool[day_pool['Recipe_name'] != pick['Recipe_name']]
-        plans.append(pd.DataFrame(day_picks))
+            code = name_codes[pick]
+            last_used[code] = d
+            # remove chosen recipe from the day's pool for remaining meals
+            available &= name_codes != code
+        yield day_picks
+
+
+def plan_positions(calories: np.ndarray, name_codes: np.ndarray, per_meal: float, days: int = 30, meals_per_day: int = 3, no_repeat_within_days: int = 7, seed: int = 0) -> List[List[int]]:
+    """All days of iter_plan_positions at once"""
+    return list(iter_plan_positions(calories, name_codes, per_meal, days=days, meals_per_day=meals_per_day,
+                                    no_repeat_within_days=no_repeat_within_days, seed=seed))
+
+
+class PlanDay(NamedTuple):
+    """One planned day in compact form.
+
+    rows: positions (in the recipes frame given to the planner) of the picked recipes, in meal order
+    repeat_penalty: penalty each pick carried on the day it was picked (1 = not a recent repeat)
+    """
+    rows: Tuple[int, ...]
+    repeat_penalty: Tuple[int, ...]
+
+
+def iter_plan_days(recipes: pd.DataFrame, patient: pd.Series, days: int = 30, meals_per_day: int = 3, no_repeat_within_days: int = 7, seed: int = 0) -> Iterator[PlanDay]:
+    """The plan of make_30_day_plan as a lazy stream of PlanDay records.
 
-    return plans
+    A day is planned only when it is requested, so callers can stop early or page through the plan with
+    itertools.islice; day_frame() builds the DataFrame view of a record when one is needed.
+    """
+    target = float(patient.get('target_calories', 2000))
+    per_meal = target / meals_per_day
+
+    names = recipes['Recipe_name']
+    kept = np.flatnonzero(names.notna().to_numpy())
+    calories = recipes['calories'].to_numpy(dtype=float)[kept]
+    name_codes, _ = pd.factorize(names.iloc[kept], sort=True)
+    picks = iter_plan_positions(calories, name_codes, per_meal, days=days, meals_per_day=meals_per_day,
+                                no_repeat_within_days=no_repeat_within_days, seed=seed)
+
+    # penalties of the picks as they stood on the day they were picked
+    last_used = {}
+    for d, day_picks in enumerate(picks):
+        penalties = []
+        for pos in day_picks:
+            days_since = d - last_used.get(name_codes[pos], -(days + no_repeat_within_days + 1))
+            penalties.append(1 + (no_repeat_within_days - days_since) if days_since < no_repeat_within_days else 1)
+        for pos in day_picks:
+            last_used[name_codes[pos]] = d
+        yield PlanDay(tuple(kept[day_picks].tolist()), tuple(penalties))
+
+
+def day_frame(recipes: pd.DataFrame, day: PlanDay, patient: pd.Series, meals_per_day: int = 3) -> pd.DataFrame:
+    """DataFrame view of a PlanDay: the picked rows plus their abs_diff / repeat_penalty / weighted_score"""
+    per_meal = float(patient.get('target_calories', 2000)) / meals_per_day
+    frame = recipes.iloc[list(day.rows)].copy()
+    frame['abs_diff'] = np.abs(frame['calories'].to_numpy(dtype=float) - per_meal)
+    frame['repeat_penalty'] = list(day.repeat_penalty)
+    frame['weighted_score'] = frame['abs_diff'] * frame['repeat_penalty']
+    return frame
+
+
+def iter_day_plans(recipes: pd.DataFrame, patient: pd.Series, days: int = 30, meals_per_day: int = 3, no_repeat_within_days: int = 7, seed: int = 0) -> Iterator[pd.DataFrame]:
+    """Yield the days of make_30_day_plan one at a time, each as soon as it is planned"""
+    for day in iter_plan_days(recipes, patient, days=days, meals_per_day=meals_per_day,
+                              no_repeat_within_days=no_repeat_within_days, seed=seed):
+        yield day_frame(recipes, day, patient, meals_per_day=meals_per_day)
+
+
+def make_30_day_plan(recipes: pd.DataFrame, patient: pd.Series, days: int = 30, meals_per_day: int = 3, no_repeat_within_days: int = 7, seed: int = 0) -> List[pd.DataFrame]:
+    """Make a multi-day plan from candidate recipes.
+
+    no_repeat_within_days: do not repeat the same recipe within this many days (soft constraint enforced by blocking recent picks)
+    seed: for deterministic selection when scores tie
+    """
+    return list(iter_day_plans(recipes, patient, days=days, meals_per_day=meals_per_day,
+                               no_repeat_within_days=no_repeat_within_days, seed=seed))
 
 
 if __name__ == '__main__':
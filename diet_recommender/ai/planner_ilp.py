@@ -1,26 +1,84 @@
 from typing import List
+import numpy as np
 import pandas as pd
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ai.planner import plan_positions
 
 # ILP planner using pulp to enforce hard no-repeat constraints
 
-def make_plan_ilp(recipes: pd.DataFrame, patient: pd.Series, days: int = 30, meals_per_day: int = 3, no_repeat_within_days: int = 7):
+
+def greedy_warm_start(calories: np.ndarray, name_codes: np.ndarray, per_meal: float, days: int, meals_per_day: int, no_repeat_within_days: int, window: int) -> List[int]:
+    """Feasible slot -> row assignment seeded from the greedy planner.
+
+    The greedy no-repeat rule is only a penalty, so slots that would reuse a row inside the window are
+    repaired with the cheapest row not used in the preceding window - 1 slots.
+    Raises RuntimeError when there are fewer rows than min(window, number of slots), i.e. no feasible plan exists.
+    """
+    if len(calories) < min(window, days * meals_per_day):
+        raise RuntimeError(f'No feasible plan: {len(calories)} recipes for a no-repeat window of {window} meals')
+    greedy = plan_positions(calories, name_codes, per_meal, days=days, meals_per_day=meals_per_day, no_repeat_within_days=no_repeat_within_days)
+    by_cost = np.argsort(np.abs(calories - per_meal), kind='stable')
+    assignment = []
+    for day_picks in greedy:
+        day_picks = list(day_picks) + [None] * (meals_per_day - len(day_picks))
+        for pick in day_picks:
+            recent = set(assignment[-(window - 1):]) if window > 1 else set()
+            if pick is None or pick in recent:
+                pick = next(int(i) for i in by_cost if i not in recent)
+            assignment.append(int(pick))
+    return assignment
+
+
+def make_plan_ilp(recipes: pd.DataFrame, patient: pd.Series, days: int = 30, meals_per_day: int = 3, no_repeat_within_days: int = 7, max_candidates: int = None,
+                  time_limit: float = 10, gap_rel: float = 0.01, threads: int = None, warm_start: bool = True):
+    """Plan with a hard no-repeat constraint, solved as an ILP.
+
+    max_candidates: only this many recipes with the lowest calorie cost are modelled. Every run of `window`
+                    consecutive slots needs distinct recipes, so no plan costs less than repeating the
+                    min(window, n_slots) cheapest recipes cyclically: pruning to at least that many never
+                    changes the optimum. None (default) keeps exactly that many.
+    time_limit: seconds CBC may spend searching; the best feasible plan found by then is returned
+                (CBC checks it during branch and bound, not while solving the root relaxation)
+    gap_rel: relative MIP gap at which CBC stops searching
+    threads: CBC threads (None = solver default)
+    warm_start: seed CBC with the greedy make_30_day_plan assignment so an incumbent exists from the start
+    Raises RuntimeError when no feasible plan was found, so callers can fall back to the greedy planner.
+    """
     try:
         import pulp
     except Exception as e:
         raise RuntimeError('pulp is required for ILP planner. Install with `pip install pulp`.') from e
 
-    # limit candidate pool size for tractability
-    pool = recipes.copy().reset_index(drop=True)
-    pool = pool.dropna(subset=['Recipe_name'])
-    n_recipes = len(pool)
+    pool = recipes.dropna(subset=['Recipe_name']).reset_index(drop=True)
     n_slots = days * meals_per_day
+    # slots closer than this may not share a recipe
+    window = no_repeat_within_days * meals_per_day + 1
 
     # compute the per-slot target calories
     target = float(patient.get('target_calories', 2000))
     per_meal = target / meals_per_day
 
     # precompute cost: abs diff of recipe calories to per_meal
-    costs = [abs(float(c) - per_meal) for c in pool['calories']]
+    calories = pool['calories'].to_numpy(dtype=float)
+    all_costs = np.abs(calories - per_meal)
+
+    # limit candidate pool size for tractability
+    keep = min(window, n_slots)
+    if max_candidates is not None:
+        keep = max(keep, max_candidates)
+    if len(pool) > keep:
+        kept = np.sort(np.argsort(all_costs, kind='stable')[:keep])
+        pool = pool.iloc[kept].reset_index(drop=True)
+        calories = calories[kept]
+        all_costs = all_costs[kept]
+    n_recipes = len(pool)
+    costs = all_costs.tolist()
+    if n_recipes < min(window, n_slots):
+        # some run of `window` slots would need more distinct recipes than there are
+        raise RuntimeError(f'ILP has no feasible solution: {n_recipes} recipes for a no-repeat window of {window} meals')
 
     # decision vars x[i,s] -> recipe i assigned to slot s
     prob = pulp.LpProblem('meal_plan', pulp.LpMinimize)
@@ -33,43 +91,41 @@ def make_plan_ilp(recipes: pd.DataFrame, patient: pd.Series, days: int = 30, mea
     for s in range(n_slots):
         prob += pulp.lpSum([x[(i, s)] for i in range(n_recipes)]) == 1
 
-    # optional: avoid assigning same recipe to overlapping slots within no_repeat window
-    for i in range(n_recipes):
-        for s in range(n_slots):
-            for t in range(max(0, s - no_repeat_within_days * meals_per_day), min(n_slots, s + no_repeat_within_days * meals_per_day + 1)):
-                if s != t:
-                    # prevent both s and t from using recipe i if within window
-                    prob += x[(i, s)] + x[(i, t)] <= 1
-
-    # solve with pulp's default solver
-    prob.solve()
-    status = pulp.LpStatus.get(prob.status, None) if hasattr(pulp, 'LpStatus') else None
-    # pulp may expose LpStatus differently depending on version; fallback to prob.status
-    try:
-        status_name = pulp.LpStatus[prob.status]
-    except Exception:
-        status_name = None
-    # if solver did not find optimal, raise so caller can fallback
-    if status_name is None and status is None:
-        pass
+    # no repeat within the window: every run of `window` consecutive slots uses a recipe at most once,
+    # one constraint per recipe per window instead of one per pair of slots
+    if window > 1:
+        starts = range(max(1, n_slots - window + 1))
+        for i in range(n_recipes):
+            for w in starts:
+                prob += pulp.lpSum([x[(i, s)] for s in range(w, min(n_slots, w + window))]) <= 1
+
+    if warm_start:
+        name_codes, _ = pd.factorize(pool['Recipe_name'], sort=True)
+        start = greedy_warm_start(calories, name_codes, per_meal, days, meals_per_day, no_repeat_within_days, window)
+        for s, i in enumerate(start):
+            x[(i, s)].setInitialValue(1)
+
+    solver = pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit, gapRel=gap_rel, threads=threads, warmStart=warm_start)
+    prob.solve(solver)
+    # a time-limited solve may stop at a feasible, not proven optimal, incumbent; accept it
+    sol_status = getattr(prob, 'sol_status', None)
+    if sol_status is not None:
+        feasible = sol_status in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible)
     else:
-        sname = status_name or status
-        if sname != 'Optimal':
-            raise RuntimeError(f'ILP solver did not find optimal solution: {sname}')
-
-    # build plan
-    plans = []
-    for d in range(days):
-        day_meals = []
-        for m in range(meals_per_day):
-            s = d * meals_per_day + m
-            chosen = None
-            for i in range(n_recipes):
-                val = pulp.value(x[(i, s)])
-                if val is not None and val > 0.5:
-                    chosen = pool.iloc[i]
-                    break
-            if chosen is not None:
-                day_meals.append(chosen)
-        plans.append(pd.DataFrame(day_meals))
-    return plans
+        feasible = prob.status == pulp.LpStatusOptimal
+    if not feasible:
+        raise RuntimeError(f'ILP solver did not find a feasible solution: {pulp.LpStatus.get(prob.status, prob.status)}')
+
+    # read the solution back in one pass over the variables: slot -> chosen row
+    assignment = np.full(n_slots, -1, dtype=np.int64)
+    for (i, s), var in x.items():
+        val = var.varValue
+        if val is not None and val > 0.5:
+            assignment[s] = i
+
+    # build plan from a single take over the pool
+    chosen = assignment[assignment >= 0]
+    picked = pool.take(chosen)
+    day_of_pick = np.flatnonzero(assignment >= 0) // meals_per_day
+    bounds = np.searchsorted(day_of_pick, np.arange(days + 1))
+    return [picked.iloc[bounds[d]:bounds[d + 1]] for d in range(days)]
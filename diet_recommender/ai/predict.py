@@ -1,13 +1,16 @@
 import os
 import json
 import pandas as pd
+from typing import Dict, List
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from ai.model_utils import load_model
-from utils.preprocess import load_recipes, clean_recipes, load_patients, compute_daily_needs
-from ai.recommend import recommend_top_n, filter_by_allergies_and_restrictions
+from ai.features import featurize_batch
+from utils.preprocess import load_patients, compute_daily_needs
+from utils.catalog import get_catalog
+from ai.recommend import recommend_top_n, filter_by_allergies_and_restrictions, catalog_token_index
 from ai.planner import make_30_day_plan
 try:
     from ai.planner_ilp import make_plan_ilp
@@ -32,22 +35,7 @@ def load_artifacts(model_dir=MODEL_DIR):
 
 
 def patient_row_to_features(patient_row: pd.Series, feature_cols, encoders):
-    p = patient_row.copy()
-    p = compute_daily_needs(pd.DataFrame([p])).iloc[0]
-    # basic numeric conversions
-    X = {}
-    for c in ['Age','Weight_kg','Height_cm','BMI','Weekly_Exercise_Hours','Adherence_to_Diet_Plan','Dietary_Nutrient_Imbalance_Score','target_calories']:
-        X[c] = float(p.get(c, 0))
-    # categorical encoding
-    for name, enc in encoders.items():
-        val = str(p.get(name, ''))
-        try:
-            X[name + '_enc'] = int(enc.transform([val])[0])
-        except Exception:
-            # unseen label -> map to 0
-            X[name + '_enc'] = 0
-    # ensure order
-    return pd.DataFrame([X])[feature_cols]
+    return featurize_batch(pd.DataFrame([patient_row]), feature_cols, encoders)
 
 
 def format_plan_output(patient, plans):
@@ -64,6 +52,52 @@ def format_plan_output(patient, plans):
     return '\n'.join(lines)
 
 
+def predict_label_probs(clf, le, X) -> List[Dict[str, float]]:
+    """Diet label -> probability for every row of X, from a single predict_proba (or predict) call"""
+    if hasattr(clf, 'predict_proba'):
+        probs = clf.predict_proba(X)
+        return [{lab: float(p) for lab, p in zip(le.classes_, row)} for row in probs]
+    return [{lab: 1.0} for lab in le.inverse_transform(clf.predict(X))]
+
+
+def recommend_and_plan(catalog, patient, label_probs, n: int = 1000, days: int = 30, meals_per_day: int = 3, no_repeat_within_days: int = 7, use_ilp: bool = False, token_index=None):
+    """Candidate recommendations for one patient followed by the meal plan; returns the day frames"""
+    if token_index is None:
+        token_index = catalog_token_index(catalog)
+    # get candidate recommendations; pass model-derived diet label probabilities to boost matching recipes
+    candidates = recommend_top_n(catalog.frame, patient, n=n, diet_label_probs=label_probs, index=token_index, catalog=catalog)
+
+    # generate plan using prefiltered candidate pool for better quality
+    plan_pool = filter_by_allergies_and_restrictions(candidates, patient, index=token_index)
+    if use_ilp and make_plan_ilp is not None:
+        try:
+            return make_plan_ilp(plan_pool, patient, days=days, meals_per_day=meals_per_day, no_repeat_within_days=no_repeat_within_days)
+        except Exception:
+            pass
+    return make_30_day_plan(plan_pool, patient, days=days, meals_per_day=meals_per_day, no_repeat_within_days=no_repeat_within_days)
+
+
+def plan_to_dict(patient, plans) -> dict:
+    """JSON-serializable form of a patient's plan"""
+    out = {
+        'Patient_ID': patient.get('Patient_ID', ''),
+        'target_calories': float(patient.get('target_calories', 0)),
+        'Dietary_Restrictions': str(patient.get('Dietary_Restrictions','')),
+        'Allergies': str(patient.get('Allergies','')),
+        'days': []
+    }
+    for i, day in enumerate(plans):
+        day_entry = {
+            'day': i+1,
+            'day_total': float(day['calories'].sum()) if not day.empty else 0,
+            'meals': []
+        }
+        for _, r in day.iterrows():
+            day_entry['meals'].append({'Recipe_name': r['Recipe_name'], 'Cuisine_type': r.get('Cuisine_type',''), 'calories': float(r['calories'])})
+        out['days'].append(day_entry)
+    return out
+
+
 def predict_and_recommend(patient_index: int = 0, days: int = 30, meals_per_day: int = 3, output_json: bool = False, out_path: str = None, no_repeat_within_days: int = 7, use_ilp: bool = False):
     clf, le, feature_cols, encoders = load_artifacts()
     patients = load_patients()
@@ -72,55 +106,21 @@ def predict_and_recommend(patient_index: int = 0, days: int = 30, meals_per_day:
 
     X = patient_row_to_features(patient, feature_cols, encoders)
     # predict and get probabilities for diet labels
-    pred_enc = clf.predict(X)[0]
-    pred_label = le.inverse_transform([pred_enc])[0]
-    if hasattr(clf, 'predict_proba'):
-        probs = clf.predict_proba(X)[0]
-        label_probs = {lab: float(p) for lab, p in zip(le.classes_, probs)}
-    else:
-        label_probs = {pred_label: 1.0}
-
-    # load recipes and filter
-    recipes = load_recipes()
-    recipes = clean_recipes(recipes)
-    # get candidate recommendations; pass model-derived diet label probabilities to boost matching recipes
-    candidates = recommend_top_n(recipes, patient, n=1000, diet_label_probs=label_probs)
+    label_probs = predict_label_probs(clf, le, X)[0]
 
-    # generate plan using prefiltered candidate pool for better quality
-    plan_pool = filter_by_allergies_and_restrictions(candidates, patient)
-    if use_ilp and make_plan_ilp is not None:
-        try:
-            plans = make_plan_ilp(plan_pool, patient, days=days, meals_per_day=meals_per_day, no_repeat_within_days=no_repeat_within_days)
-        except Exception:
-            plans = make_30_day_plan(plan_pool, patient, days=days, meals_per_day=meals_per_day, no_repeat_within_days=no_repeat_within_days)
-    else:
-        plans = make_30_day_plan(plan_pool, patient, days=days, meals_per_day=meals_per_day, no_repeat_within_days=no_repeat_within_days)
+    # cleaned recipe catalog (parsed once per process) and its allergen token index
+    catalog = get_catalog()
+    plans = recommend_and_plan(catalog, patient, label_probs, n=1000, days=days, meals_per_day=meals_per_day,
+                               no_repeat_within_days=no_repeat_within_days, use_ilp=use_ilp)
 
     if output_json or out_path:
         # serialize to JSON
-        out = {
-            'Patient_ID': patient.get('Patient_ID', ''),
-            'target_calories': float(patient.get('target_calories', 0)),
-            'Dietary_Restrictions': str(patient.get('Dietary_Restrictions','')),
-            'Allergies': str(patient.get('Allergies','')),
-            'days': []
-        }
-        for i, day in enumerate(plans):
-            day_entry = {
-                'day': i+1,
-                'day_total': float(day['calories'].sum()) if not day.empty else 0,
-                'meals': []
-            }
-            for _, r in day.iterrows():
-                day_entry['meals'].append({'Recipe_name': r['Recipe_name'], 'Cuisine_type': r.get('Cuisine_type',''), 'calories': float(r['calories'])})
-            out['days'].append(day_entry)
+        out = plan_to_dict(patient, plans)
         if out_path:
             with open(out_path, 'w', encoding='utf8') as fh:
-                import json
                 json.dump(out, fh, indent=2)
             print(f"Wrote JSON output to {out_path}")
         if output_json:
-            import json
             print(json.dumps(out, indent=2))
         return out
 
@@ -128,5 +128,38 @@ def predict_and_recommend(patient_index: int = 0, days: int = 30, meals_per_day:
     print(output)
 
 
+def predict_and_recommend_batch(patient_indices: List[int] = None, days: int = 30, meals_per_day: int = 3, out_path: str = None, no_repeat_within_days: int = 7, use_ilp: bool = False, patients: pd.DataFrame = None) -> List[dict]:
+    """Plans for many patients at once, in the shape of predict_and_recommend(output_json=True).
+
+    All patients are featurized into one matrix and classified with a single predict_proba call; the
+    catalog and its token index (with the cached allergy / restriction masks) are shared by every patient.
+    patient_indices: rows of the patient file to plan for (default: all of them)
+    patients: plan for these rows instead of reading the patient file
+    """
+    clf, le, feature_cols, encoders = load_artifacts()
+    if patients is None:
+        patients = load_patients()
+        if patient_indices is not None:
+            patients = patients.iloc[list(patient_indices)]
+    patients = compute_daily_needs(patients.reset_index(drop=True))
+
+    X = featurize_batch(patients, feature_cols, encoders)
+    all_label_probs = predict_label_probs(clf, le, X) if len(X) else []
+
+    catalog = get_catalog()
+    token_index = catalog_token_index(catalog)
+    results = []
+    for (_, patient), label_probs in zip(patients.iterrows(), all_label_probs):
+        plans = recommend_and_plan(catalog, patient, label_probs, n=1000, days=days, meals_per_day=meals_per_day,
+                                   no_repeat_within_days=no_repeat_within_days, use_ilp=use_ilp, token_index=token_index)
+        results.append(plan_to_dict(patient, plans))
+
+    if out_path:
+        with open(out_path, 'w', encoding='utf8') as fh:
+            json.dump(results, fh, indent=2)
+        print(f"Wrote JSON output for {len(results)} patients to {out_path}")
+    return results
+
+
 if __name__ == '__main__':
     predict_and_recommend(0)
@@ -1,7 +1,12 @@
 from typing import List, Dict
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
 import pandas as pd
 import numpy as np
-from collections import Counter
+import threading
+from collections import Counter, OrderedDict
 
 
 def score_recipe_for_patient(recipe: pd.Series, patient: pd.Series, meal_cal_target: float, cuisine_bonus=1.2) -> float:
@@ -44,108 +49,441 @@ def score_recipe_for_patient(recipe: pd.Series, patient: pd.Series, meal_cal_tar
     return score
 
 
-def filter_by_allergies_and_restrictions(recipes: pd.DataFrame, patient: pd.Series) -> pd.DataFrame:
-    df = recipes.copy()
-    # Basic filtering using the textual Diet_type and Recipe_name fields
-    allergies = str(patient.get('Allergies', '')).lower()
-    restrictions = str(patient.get('Dietary_Restrictions', '')).lower()
+SYN_PATH = Path(__file__).parent.parent / 'data' / 'ingredient_synonyms.json'
 
-    import json
-    from pathlib import Path
+# text fields searched for allergens / restricted ingredients
+FILTER_TEXT_COLUMNS = [
+    'Recipe_name',
+    'Diet_type',
+    'Cuisine_type',
+    'Ingredients',  # Check ingredients!
+    'ingredients',  # Alternative column name
+    'description',  # Sometimes descriptions have ingredients
+    'Description',
+]
 
-    SYN_PATH = Path(__file__).parent / 'data' / 'ingredient_synonyms.json'
-    SYN_MAP = {}
+
+def tokenize(s: str):
+    return [t for t in re.findall(r"[a-zA-Z]+", s.lower())]
+
+
+@lru_cache(maxsize=None)
+def simple_stem(token: str):
+    # very small stemmer: remove common plural -s, -es
+    if token.endswith('ies'):
+        return token[:-3] + 'y'
+    if token.endswith('es'):
+        return token[:-2]
+    if token.endswith('s'):
+        return token[:-1]
+    return token
+
+
+@lru_cache(maxsize=1)
+def synonym_expansions() -> Dict[str, frozenset]:
+    """Precompiled synonym table: listed term -> stemmed tokens of every synonym group containing it.
+
+    Read from data/ingredient_synonyms.json once per process.
+    """
+    syn_map = {}
     if SYN_PATH.exists():
         try:
-            SYN_MAP = json.loads(SYN_PATH.read_text(encoding='utf8'))
+            syn_map = json.loads(SYN_PATH.read_text(encoding='utf8'))
         except Exception:
-            SYN_MAP = {}
-
-    def tokenize(s: str):
-        import re
-        return [t for t in re.findall(r"[a-zA-Z]+", s.lower())]
-
-    def simple_stem(token: str):
-        # very small stemmer: remove common plural -s, -es
-        if token.endswith('ies'):
-            return token[:-3] + 'y'
-        if token.endswith('es'):
-            return token[:-2]
-        if token.endswith('s'):
-            return token[:-1]
-        return token
-
-    def violates(row):
-        # Check multiple fields for food items
-        text_fields = [
-            str(row.get('Recipe_name', '')),
-            str(row.get('Diet_type', '')),
-            str(row.get('Cuisine_type', '')),
-            str(row.get('Ingredients', '')),  # Check ingredients!
-            str(row.get('ingredients', '')),  # Alternative column name
-            str(row.get('description', '')),  # Sometimes descriptions have ingredients
-            str(row.get('Description', ''))
-        ]
-        text = ' '.join(text_fields).lower()
-        tokens = [simple_stem(t) for t in tokenize(text)]
-        
-        for a in [s.strip() for s in allergies.split(',') if s.strip()]:
-            if not a or a == 'none':
-                continue
-            atoks = [simple_stem(t) for t in tokenize(a)]
-            # expand allergy tokens using synonym map
-            expanded = set(atoks)
-            for key, vals in SYN_MAP.items():
-                for v in vals:
-                    if v in atoks:
-                        expanded.update([simple_stem(x) for x in vals])
-            # if any expanded allergy token appears in recipe tokens -> exclude
-            if any(ex in tokens for ex in expanded):
-                return True
-        for r in [s.strip() for s in restrictions.split(',') if s.strip()]:
-            if not r or r == 'none':
-                continue
-            rtoks = [simple_stem(t) for t in tokenize(r)]
-            # treat explicit ingredient restrictions like allergies (exclude)
-            if any(rr in tokens for rr in rtoks):
-                return True
-        return False
-
-    mask = df.apply(violates, axis=1)
-    return df[~mask]
-
-
-def recommend_top_n(recipes: pd.DataFrame, patient: pd.Series, n: int = 20, meals_per_day: int = 3, diet_label_probs: Dict[str, float] = None) -> pd.DataFrame:
+            syn_map = {}
+    table = {}
+    for vals in syn_map.values():
+        group = {simple_stem(x) for x in vals}
+        for v in vals:
+            table.setdefault(v, set()).update(group)
+    return {k: frozenset(v) for k, v in table.items()}
+
+
+def _split_terms(value) -> List[str]:
+    return [s.strip() for s in str(value).lower().split(',') if s.strip() and s.strip() != 'none']
+
+
+def allergy_tokens(allergy: str) -> set:
+    """Stemmed tokens of one allergy entry plus the synonyms of any of them."""
+    atoks = [simple_stem(t) for t in tokenize(allergy)]
+    expanded = set(atoks)
+    table = synonym_expansions()
+    for t in atoks:
+        expanded.update(table.get(t, ()))
+    return expanded
+
+
+def restriction_tokens(restriction: str) -> set:
+    # explicit ingredient restrictions are treated like allergies, without synonym expansion
+    return {simple_stem(t) for t in tokenize(restriction)}
+
+
+class RecipeTokenIndex:
+    """Inverted index (stemmed token -> recipe row positions) over the FILTER_TEXT_COLUMNS text.
+
+    Built once per catalog so that filtering a patient is a union of posting lists instead of
+    re-tokenizing every recipe. Row positions refer to the frame the index was built from; frames sliced
+    from it (same index labels) are mapped back through their labels.
+
+    Exclusion masks of individual allergy / restriction entries are kept in an LRU of mask_cache_size
+    entries: patients share a small vocabulary of allergies, so a patient's mask is usually just the OR
+    of a few cached boolean arrays.
+    """
+
+    def __init__(self, texts: List[str], labels: pd.Index, mask_cache_size: int = 256):
+        self.labels = labels
+        self.size = len(texts)
+        self.mask_cache_size = mask_cache_size
+        self._masks = OrderedDict()
+        self._masks_lock = threading.Lock()
+        postings = {}
+        for pos, text in enumerate(texts):
+            for tok in {simple_stem(t) for t in tokenize(text)}:
+                postings.setdefault(tok, []).append(pos)
+        self.postings = {tok: np.array(rows, dtype=np.int64) for tok, rows in postings.items()}
+
+    @classmethod
+    def from_frame(cls, recipes: pd.DataFrame) -> 'RecipeTokenIndex':
+        parts = [recipes[c].map(str).str.lower() for c in FILTER_TEXT_COLUMNS if c in recipes.columns]
+        if parts:
+            texts = parts[0]
+            for part in parts[1:]:
+                texts = texts + ' ' + part
+            texts = texts.tolist()
+        else:
+            texts = [''] * len(recipes)
+        return cls(texts, recipes.index)
+
+    @classmethod
+    def from_catalog(cls, catalog) -> 'RecipeTokenIndex':
+        # the catalog keeps its text columns already lowercased
+        cols = [catalog.text[c] for c in FILTER_TEXT_COLUMNS if c in catalog.text]
+        texts = [' '.join(vals) for vals in zip(*cols)] if cols else [''] * len(catalog)
+        return cls(texts, catalog.frame.index)
+
+    def token_mask(self, tokens) -> np.ndarray:
+        """Boolean mask of rows containing any of the given stemmed tokens."""
+        mask = np.zeros(self.size, dtype=bool)
+        for tok in tokens:
+            rows = self.postings.get(tok)
+            if rows is not None:
+                mask[rows] = True
+        return mask
+
+    def term_mask(self, kind: str, term: str) -> np.ndarray:
+        """Cached exclusion mask of one 'allergy' or 'restriction' entry (lowercased, stripped)."""
+        key = (kind, term)
+        with self._masks_lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                return mask
+        tokens = allergy_tokens(term) if kind == 'allergy' else restriction_tokens(term)
+        mask = self.token_mask(tokens)
+        mask.setflags(write=False)
+        with self._masks_lock:
+            self._masks[key] = mask
+            while len(self._masks) > self.mask_cache_size:
+                self._masks.popitem(last=False)
+        return mask
+
+    def exclusion_mask(self, patient: pd.Series) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        for a in _split_terms(patient.get('Allergies', '')):
+            mask |= self.term_mask('allergy', a)
+        for r in _split_terms(patient.get('Dietary_Restrictions', '')):
+            mask |= self.term_mask('restriction', r)
+        return mask
+
+    def positions_of(self, index: pd.Index):
+        """Row positions of the given labels in this index, or None if they are not all covered."""
+        if index is self.labels:
+            return np.arange(self.size)
+        if not self.labels.is_unique:
+            return None
+        pos = self.labels.get_indexer(index)
+        if len(pos) and pos.min() < 0:
+            return None
+        return pos
+
+
+def catalog_token_index(catalog) -> RecipeTokenIndex:
+    """Token index of a RecipeCatalog, built on first use and kept until the catalog is reloaded."""
+    return catalog.derived('token_index', RecipeTokenIndex.from_catalog)
+
+
+def filter_by_allergies_and_restrictions(recipes: pd.DataFrame, patient: pd.Series, index: RecipeTokenIndex = None) -> pd.DataFrame:
+    """Drop recipes whose text mentions one of the patient's allergens (or their synonyms) or restricted ingredients.
+
+    index: optional prebuilt RecipeTokenIndex over recipes or over the frame recipes was sliced from
+           (e.g. catalog_token_index(catalog)); built on the fly otherwise.
+    """
+    positions = index.positions_of(recipes.index) if index is not None else None
+    if positions is None:
+        index = RecipeTokenIndex.from_frame(recipes)
+        positions = np.arange(len(recipes))
+    mask = index.exclusion_mask(patient)[positions]
+    return recipes[~mask]
+
+
+def _numeric_column(recipes: pd.DataFrame, col: str) -> np.ndarray:
+    if col in recipes.columns:
+        return recipes[col].to_numpy(dtype=float)
+    return np.zeros(len(recipes))
+
+
+def _str_column(recipes: pd.DataFrame, col: str) -> pd.Series:
+    # str() per value like the row-wise code did (NaN -> 'nan'); a missing column reads as ''
+    if col in recipes.columns:
+        return recipes[col].map(str)
+    return pd.Series('', index=recipes.index)
+
+
+def target_carbs_pct_for(patient: pd.Series):
+    """Target carb share of calories for the patient's diet recommendation, or None if there is none."""
+    if 'Diet_Recommendation' in patient and pd.notna(patient['Diet_Recommendation']):
+        diet = str(patient['Diet_Recommendation']).lower()
+        if 'low_carb' in diet:
+            return 0.25
+        return 0.45
+    return None
+
+
+def _preferred_cuisine(patient: pd.Series) -> str:
+    if 'Preferred_Cuisine' not in patient or not pd.notna(patient['Preferred_Cuisine']):
+        return ''
+    return str(patient['Preferred_Cuisine']).strip().lower()
+
+
+def cuisine_match_mask(recipes: pd.DataFrame, patient: pd.Series) -> np.ndarray:
+    """True where the recipe's Cuisine_type contains the patient's Preferred_Cuisine."""
+    match = np.zeros(len(recipes), dtype=bool)
+    pref = _preferred_cuisine(patient)
+    if not pref or 'Cuisine_type' not in recipes.columns:
+        return match
+    try:
+        # non-string cuisines come back as NaN from the .str accessor and never match
+        hits = recipes['Cuisine_type'].str.lower().str.contains(pref, regex=False)
+    except AttributeError:
+        return match
+    return hits.fillna(False).to_numpy(dtype=bool)
+
+
+def score_arrays(calories: np.ndarray, protein: np.ndarray, carbs: np.ndarray, fat: np.ndarray, cuisine_match: np.ndarray,
+                 meal_cal_target: float, target_carbs_pct=None, cuisine_bonus=1.2) -> np.ndarray:
+    """Column-wise version of score_recipe_for_patient over aligned per-recipe arrays.
+
+    Produces exactly the same values as the per-row function, including its NaN behaviour
+    (a NaN macro or calorie value scores 0 for that component).
+    """
+    cal_score = 1 - (np.abs(calories - meal_cal_target) / max(1, meal_cal_target))
+    cal_score = np.where(cal_score > 0, cal_score, 0.0)
+
+    if target_carbs_pct is None:
+        macro_score = np.ones(len(calories))
+    else:
+        p = protein * 4
+        c = carbs * 4
+        f = fat * 9
+        tot = p + c + f
+        tot = np.where(tot > 1, tot, 1)
+        macro_score = 1 - np.abs(c / tot - target_carbs_pct)
+        macro_score = np.where(macro_score > 0, macro_score, 0.0)
+
+    return (0.6 * cal_score + 0.4 * macro_score) * np.where(cuisine_match, cuisine_bonus, 1.0)
+
+
+def score_recipes_for_patient(recipes: pd.DataFrame, patient: pd.Series, meal_cal_target: float, cuisine_bonus=1.2) -> np.ndarray:
+    """Score every recipe in one pass; same result as score_recipe_for_patient applied row by row."""
+    return score_arrays(
+        _numeric_column(recipes, 'calories'),
+        _numeric_column(recipes, 'Protein(g)'),
+        _numeric_column(recipes, 'Carbs(g)'),
+        _numeric_column(recipes, 'Fat(g)'),
+        cuisine_match_mask(recipes, patient),
+        meal_cal_target,
+        target_carbs_pct_for(patient),
+        cuisine_bonus,
+    )
+
+
+def diet_label_boosts(recipes: pd.DataFrame, diet_label_probs: Dict[str, float] = None) -> np.ndarray:
+    """Multiplicative boost in [1, 1 + sum(probs)] for recipes whose Diet_type/Recipe_name mention a predicted label."""
+    boost = np.ones(len(recipes))
+    if not diet_label_probs or not isinstance(diet_label_probs, dict):
+        return boost
+    text = (_str_column(recipes, 'Diet_type') + ' ' + _str_column(recipes, 'Recipe_name')).str.lower()
+    match_prob = np.zeros(len(recipes))
+    for label, prob in diet_label_probs.items():
+        if label:
+            hits = text.str.contains(label.replace('_', ' ').lower(), regex=False).to_numpy(dtype=bool)
+            match_prob = match_prob + np.where(hits, float(prob), 0.0)
+    return boost + match_prob
+
+
+def _diet_label_hits(catalog, needle: str) -> np.ndarray:
+    """Rows whose Diet_type/Recipe_name mention needle, cached on the catalog."""
+    def label_text(c):
+        dt = c.text.get('Diet_type', [''] * len(c))
+        names = c.text.get('Recipe_name', [''] * len(c))
+        return pd.Series([a + ' ' + b for a, b in zip(dt, names)])
+
+    return catalog.derived(('diet_label', needle), lambda c: c.derived('diet_label_text', label_text).str.contains(needle, regex=False).to_numpy(dtype=bool))
+
+
+def catalog_diet_label_boosts(catalog, diet_label_probs: Dict[str, float] = None, positions: np.ndarray = None) -> np.ndarray:
+    """diet_label_boosts over a whole RecipeCatalog, with the per-label text matches cached on the catalog.
+
+    positions: only return the boosts of these catalog rows
+    """
+    size = len(catalog) if positions is None else len(positions)
+    boost = np.ones(size)
+    if not diet_label_probs or not isinstance(diet_label_probs, dict):
+        return boost
+    match_prob = np.zeros(size)
+    for label, prob in diet_label_probs.items():
+        if label:
+            hits = _diet_label_hits(catalog, label.replace('_', ' ').lower())
+            if positions is not None:
+                hits = hits[positions]
+            match_prob = match_prob + np.where(hits, float(prob), 0.0)
+    return boost + match_prob
+
+
+# half-width of the first calorie band around a per-meal target; bands double until they provably hold the top n
+SHORTLIST_START_KCAL = 4
+
+
+class CalorieShortlistIndex:
+    """Catalog rows grouped by cuisine and by which diet-label needles they mention, each group sorted by calories.
+
+    Within a group the cuisine bonus and the label boost are the same for every row, so a calorie band
+    around a patient's per-meal target is a contiguous slice of each group, and the best score any row
+    outside the slice can reach is known. recommend_top_n scores only the slices and widens them until
+    the n-th best score beats every such bound, which gives exactly the full-catalog result.
+    """
+
+    def __init__(self, catalog, needles: tuple = ()):
+        frame = catalog.frame
+        self.size = len(frame)
+        self.calories = _numeric_column(frame, 'calories')
+        self.protein = _numeric_column(frame, 'Protein(g)')
+        self.carbs = _numeric_column(frame, 'Carbs(g)')
+        self.fat = _numeric_column(frame, 'Fat(g)')
+
+        if needles:
+            hits = np.column_stack([_diet_label_hits(catalog, needle) for needle in needles])
+            combos, label_group = np.unique(hits, axis=0, return_inverse=True)
+            label_group = label_group.reshape(-1)
+        else:
+            combos, label_group = np.zeros((1, 0), dtype=bool), np.zeros(self.size, dtype=np.int64)
+        if 'Cuisine_type' in frame.columns:
+            cuisine_code, cuisines = pd.factorize(frame['Cuisine_type'])
+            cuisines = list(cuisines)
+        else:
+            cuisine_code, cuisines = np.full(self.size, -1), []
+        keys, group = np.unique(label_group * (len(cuisines) + 1) + (cuisine_code + 1), return_inverse=True)
+        group = group.reshape(-1)
+        self.group = group
+
+        # by group, then calories (missing last), then catalog position
+        self.order = np.lexsort((np.arange(self.size), self.calories, group))
+        self.sorted_calories = self.calories[self.order]
+        sorted_group = group[self.order]
+        self.starts = np.searchsorted(sorted_group, np.arange(len(keys)), side='left')
+        self.ends = np.searchsorted(sorted_group, np.arange(len(keys)), side='right')
+        self.finite_ends = self.starts + np.array([np.count_nonzero(~np.isnan(self.sorted_calories[s:e])) for s, e in zip(self.starts, self.ends)], dtype=np.int64)
+        self.group_combo = combos[keys // (len(cuisines) + 1)]
+        # cuisine value of each group; only str values can match a preference
+        self.group_cuisine = [cuisines[c - 1] if c > 0 and isinstance(cuisines[c - 1], str) else None for c in keys % (len(cuisines) + 1)]
+
+    def top_n(self, catalog, patient: pd.Series, n: int, meal_cal_target: float, diet_label_probs: Dict[str, float] = None, excluded: np.ndarray = None, cuisine_bonus=1.2):
+        """(positions, base_score, boost) of recommend_top_n's top n over the catalog, in its order"""
+        labels = [label for label in diet_label_probs if label] if isinstance(diet_label_probs, dict) else []
+        probs = np.array([float(diet_label_probs[label]) for label in labels])
+        group_boost = 1 + (self.group_combo * probs).sum(axis=1) if labels else np.ones(len(self.starts))
+        pref = _preferred_cuisine(patient)
+        group_match = np.array([bool(pref) and v is not None and pref in v.lower() for v in self.group_cuisine], dtype=bool)
+        group_weight = np.where(group_match, cuisine_bonus, 1.0) * group_boost
+        target_carbs_pct = target_carbs_pct_for(patient)
+
+        if self.size == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+        half_width = np.full(len(self.starts), float(SHORTLIST_START_KCAL))
+        while True:
+            slices = []
+            outside = []
+            for g, (start, end, finite_end) in enumerate(zip(self.starts, self.ends, self.finite_ends)):
+                cals = self.sorted_calories[start:finite_end]
+                lo = start + np.searchsorted(cals, meal_cal_target - half_width[g], side='left')
+                hi = start + np.searchsorted(cals, meal_cal_target + half_width[g], side='right')
+                if lo == start and hi == finite_end:
+                    # the window spans every row with calories; take the group whole
+                    hi = end
+                slices.append(self.order[lo:hi])
+                outside.append(lo > start or hi < end)
+            cand = np.concatenate(slices)
+            if excluded is not None:
+                cand = cand[~excluded[cand]]
+            base = score_arrays(self.calories[cand], self.protein[cand], self.carbs[cand], self.fat[cand],
+                                group_match[self.group[cand]], meal_cal_target, target_carbs_pct, cuisine_bonus)
+            boost = catalog_diet_label_boosts(catalog, diet_label_probs, positions=cand)
+            score = base * boost
+            nth = np.partition(score, len(score) - n)[len(score) - n] if len(score) >= n else None
+
+            grow = []
+            for g in range(len(self.starts)):
+                if not outside[g]:
+                    continue
+                # rows outside the window miss the target by more than half_width; macro score is at most 1
+                cal_bound = max(0.0, 1 - half_width[g] / max(1, meal_cal_target))
+                best_outside = (0.6 * cal_bound + 0.4) * group_weight[g]
+                # the margin absorbs rounding differences between the bound and the scores themselves
+                if nth is None or not nth > best_outside * (1 + 1e-9):
+                    grow.append(g)
+            if not grow:
+                # score descending, ties in catalog order, like the stable sort in recommend_top_n
+                order = np.lexsort((cand, -score))[:n]
+                return cand[order], base[order], boost[order]
+            half_width[grow] *= 2
+
+
+def catalog_shortlist_index(catalog, diet_label_probs: Dict[str, float] = None) -> CalorieShortlistIndex:
+    """CalorieShortlistIndex for the labels of diet_label_probs, built on first use and kept with the catalog."""
+    labels = [label for label in diet_label_probs if label] if isinstance(diet_label_probs, dict) else []
+    needles = tuple(label.replace('_', ' ').lower() for label in labels)
+    return catalog.derived(('calorie_shortlists', needles), lambda c: CalorieShortlistIndex(c, needles))
+
+
+def recommend_top_n(recipes: pd.DataFrame, patient: pd.Series, n: int = 20, meals_per_day: int = 3, diet_label_probs: Dict[str, float] = None, index: RecipeTokenIndex = None, catalog=None) -> pd.DataFrame:
     """
     Recommend top N recipes for a patient.
 
     If diet_label_probs is provided (mapping from diet label string -> probability), recipes that match a label
     will receive a multiplicative boost proportional to that probability.
+    index: optional prebuilt RecipeTokenIndex for the allergy filter (see filter_by_allergies_and_restrictions)
+    catalog: the RecipeCatalog whose frame recipes is; scores only the recipes near the calorie target
+             (see CalorieShortlistIndex) with the same result
     """
     meal_cal = patient.get('target_calories', 2000) / float(meals_per_day)
-    cand = filter_by_allergies_and_restrictions(recipes, patient)
-
-    scores = []
-    boosts = []
-    for _, r in cand.iterrows():
-        s = score_recipe_for_patient(r, patient, meal_cal)
-        boost = 1.0
-        if diet_label_probs and isinstance(diet_label_probs, dict):
-            # compute a boost by checking if any diet label text appears in the recipe's Diet_type or Recipe_name
-            text = ' '.join([str(r.get('Diet_type','')), str(r.get('Recipe_name',''))]).lower()
-            match_prob = 0.0
-            for label, prob in diet_label_probs.items():
-                if label and label.replace('_',' ').lower() in text:
-                    match_prob += float(prob)
-            # scale boost into [1, 1 + match_prob]
-            boost = 1.0 + match_prob
-        scores.append(s)
-        boosts.append(boost)
+    if catalog is not None and recipes is catalog.frame and n > 0 and np.isfinite(meal_cal):
+        if index is None:
+            index = catalog_token_index(catalog)
+        positions, base, boost = catalog_shortlist_index(catalog, diet_label_probs).top_n(
+            catalog, patient, n, meal_cal, diet_label_probs, excluded=index.exclusion_mask(patient))
+        out = recipes.iloc[positions].copy()
+        out['base_score'] = base
+        out['boost'] = boost
+        out['score'] = out['base_score'] * out['boost']
+        return out
+
+    cand = filter_by_allergies_and_restrictions(recipes, patient, index=index)
+
     cand = cand.copy()
-    cand['base_score'] = scores
-    cand['boost'] = boosts
+    cand['base_score'] = score_recipes_for_patient(cand, patient, meal_cal)
+    cand['boost'] = diet_label_boosts(cand, diet_label_probs)
     cand['score'] = cand['base_score'] * cand['boost']
-    return cand.sort_values('score', ascending=False).head(n)
+    return cand.sort_values('score', ascending=False, kind='stable').head(n)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from ai.predict import load_artifacts, MODEL_DIR
+
+ARTIFACT_FILES = [
+    'rf_diet_recommender.joblib',
+    'label_encoder.joblib',
+    'feature_cols.json',
+    'Gender_encoder.joblib',
+    'Disease_Type_encoder.joblib',
+    'Physical_Activity_Level_encoder.joblib',
+]
+
+
+def artifact_fingerprint(model_dir=MODEL_DIR):
+    """Cheap change detector for the model directory: (name, mtime_ns, size) per artifact file."""
+    fp = []
+    for name in ARTIFACT_FILES:
+        try:
+            st = os.stat(os.path.join(model_dir, name))
+            fp.append((name, st.st_mtime_ns, st.st_size))
+        except OSError:
+            fp.append((name, None, None))
+    return tuple(fp)
+
+
+class ModelRegistry:
+    """Holds the trained artifacts in memory and hot-swaps them when the files change on disk.
+
+    get() returns the (clf, le, feature_cols, encoders) tuple of load_artifacts. The tuple is replaced as a
+    whole, so a request always sees one consistent set of artifacts even while a reload is in progress.
+    check_interval: minimum number of seconds between two stat() checks of the model directory
+    """
+
+    def __init__(self, model_dir=MODEL_DIR, check_interval: float = 2.0):
+        self.model_dir = model_dir
+        self.check_interval = check_interval
+        self._artifacts = None
+        self._fingerprint = None
+        self._version = 0
+        self._last_check = 0.0
+        self._last_peek = 0.0
+        self._changed_on_disk = False
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        """Incremented every time a new set of artifacts is swapped in."""
+        return self._version
+
+    @property
+    def fingerprint(self):
+        """artifact_fingerprint of the loaded artifacts (None until loaded); unlike version it is stable across processes."""
+        return self._fingerprint
+
+    def changed_on_disk(self) -> bool:
+        """True when the model files differ from the loaded artifacts.
+
+        Stats the files at most once per check_interval and never loads, so it is cheap enough for the event loop.
+        """
+        now = time.monotonic()
+        if now - self._last_peek >= self.check_interval:
+            self._last_peek = now
+            self._changed_on_disk = artifact_fingerprint(self.model_dir) != self._fingerprint
+        return self._changed_on_disk
+
+    def load(self):
+        """(Re)load the artifacts from disk unconditionally and swap them in."""
+        with self._lock:
+            return self._load_locked()
+
+    def _load_locked(self):
+        fingerprint = artifact_fingerprint(self.model_dir)
+        artifacts = load_artifacts(self.model_dir)
+        # if the files changed while we were reading them, the next check picks up the newer version
+        self._artifacts = artifacts
+        self._fingerprint = fingerprint
+        self._version += 1
+        self._last_check = time.monotonic()
+        self._last_peek = 0.0
+        return artifacts
+
+    def get(self):
+        artifacts = self._artifacts
+        now = time.monotonic()
+        if artifacts is not None and now - self._last_check < self.check_interval:
+            return artifacts
+        with self._lock:
+            if self._artifacts is None:
+                return self._load_locked()
+            if time.monotonic() - self._last_check >= self.check_interval:
+                self._last_check = time.monotonic()
+                if artifact_fingerprint(self.model_dir) != self._fingerprint:
+                    try:
+                        return self._load_locked()
+                    except Exception:
+                        # half-written files (e.g. training still running): keep serving the old model
+                        pass
+            return self._artifacts
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry(model_dir=MODEL_DIR) -> ModelRegistry:
+    """Process-wide registry shared by the API and the CLI entry points."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry(model_dir)
+    return _registry
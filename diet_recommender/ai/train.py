@@ -7,6 +7,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from utils.preprocess import compute_daily_needs
 from ai.model_utils import save_model, fit_label_encoder
+from ai.features import NUMERIC_FEATURES, CATEGORICAL_FEATURES, encode_categories
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.metrics import classification_report
@@ -40,17 +41,15 @@ def featurize(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series, dict]:
     df['Physical_Activity_Level'] = df['Physical_Activity_Level'].fillna('Unknown')
 
     # label encode categories with sklearn and save encoders later
-    cats = ['Gender', 'Disease_Type', 'Physical_Activity_Level']
-    encoders = {}
-    for c in cats:
-        le = LabelEncoder()
-        df[c+'_enc'] = le.fit_transform(df[c].astype(str))
-        encoders[c] = le
+    # (codes come from the same lookup prediction uses)
+    cats = CATEGORICAL_FEATURES
+    encoders = {c: LabelEncoder().fit(df[c].astype(str)) for c in cats}
+    df = df.join(encode_categories(df, encoders))
 
     # target label
     y = df['Diet_Recommendation'].fillna('Balanced')
 
-    feature_cols = ['Age', 'Weight_kg', 'Height_cm', 'BMI', 'Weekly_Exercise_Hours', 'Adherence_to_Diet_Plan', 'Dietary_Nutrient_Imbalance_Score', 'target_calories'] + [c + '_enc' for c in cats]
+    feature_cols = NUMERIC_FEATURES + [c + '_enc' for c in cats]
     X = df[feature_cols]
     return X, y, {'feature_cols': feature_cols, 'encoders': encoders}
 
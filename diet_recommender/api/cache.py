@@ -0,0 +1,194 @@
+"""
+Response cache for deterministic endpoints.
+Entries are serialized response bodies keyed by a hash of the normalized request plus the model / catalog
+fingerprints, evicted by TTL and LRU, and optionally mirrored to a directory so they survive restarts.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+
+def cache_key(*parts) -> str:
+    """sha256 over a canonical JSON encoding of parts (dict key order and whitespace do not matter)"""
+    blob = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf8")).hexdigest()
+
+
+class ResponseCache:
+    """LRU of at most max_entries response bodies, each valid for ttl seconds.
+
+    persist_dir: also write every entry there; load() reads them back, e.g. after a restart
+    max_disk_entries: most files kept in persist_dir; put() sweeps the directory at least every
+                      sweep_interval seconds (and whenever this many may have been written), removing
+                      expired files and then the oldest ones over the limit
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0, persist_dir: str = None,
+                 max_disk_entries: int = 10000, sweep_interval: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist_dir = persist_dir
+        self.max_disk_entries = max_disk_entries
+        self.sweep_interval = sweep_interval
+        if persist_dir:
+            os.makedirs(persist_dir, exist_ok=True)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        # first put() sweeps, which also clears what earlier processes left behind
+        self._last_sweep = 0.0
+        self._disk_files = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Body cached in memory for key, or None (never touches the disk, so it is cheap on the event loop)"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, body = entry
+                if time.time() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return body
+                del self._entries[key]
+            self.misses += 1
+        return None
+
+    def load(self, key: str) -> Optional[bytes]:
+        """Body persisted for key by this or an earlier process, or None; a hit is kept in memory as well"""
+        if not self.enabled or not self.persist_dir:
+            return None
+        body = self._read_disk(key, time.time())
+        if body is not None:
+            with self._lock:
+                self.disk_hits += 1
+        return body
+
+    def put(self, key: str, body: bytes):
+        if not self.enabled:
+            return
+        now = time.time()
+        self._remember(key, now, body)
+        if self.persist_dir:
+            self._write_disk(key, body)
+            with self._lock:
+                self._disk_files += 1
+                due = now - self._last_sweep >= self.sweep_interval or self._disk_files > self.max_disk_entries
+            if due:
+                self.sweep(now)
+
+    def _remember(self, key: str, stored_at: float, body: bytes):
+        with self._lock:
+            self._entries[key] = (stored_at, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.persist_dir, key + ".json")
+
+    def _read_disk(self, key: str, now: float) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            stored_at = os.stat(path).st_mtime
+            if now - stored_at >= self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "rb") as fh:
+                body = fh.read()
+        except OSError:
+            return None
+        self._remember(key, stored_at, body)
+        return body
+
+    def _write_disk(self, key: str, body: bytes):
+        path = self._path(key)
+        tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with open(tmp, "wb") as fh:
+                fh.write(body)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Warning: could not persist cached response: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def sweep(self, now: float = None):
+        """Remove expired files from persist_dir, then the oldest ones beyond max_disk_entries"""
+        if not self.persist_dir or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.time() if now is None else now
+            files = []
+            with os.scandir(self.persist_dir) as it:
+                for entry in it:
+                    # .tmp files are leftovers of interrupted writes once they are that old
+                    if not entry.name.endswith((".json", ".tmp")):
+                        continue
+                    try:
+                        mtime = entry.stat().st_mtime
+                        if now - mtime >= self.ttl:
+                            os.remove(entry.path)
+                        elif entry.name.endswith(".json"):
+                            files.append((mtime, entry.path))
+                    except OSError:
+                        # removed by another process sharing the directory
+                        pass
+            excess = len(files) - self.max_disk_entries
+            if excess > 0:
+                files.sort()
+                for _, path in files[:excess]:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            with self._lock:
+                self._last_sweep = now
+                self._disk_files = min(len(files), self.max_disk_entries)
+        except OSError as e:
+            print(f"Warning: could not sweep response cache directory: {e}")
+        finally:
+            self._sweep_lock.release()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "persistent": bool(self.persist_dir),
+            "disk_files": self._disk_files if self.persist_dir else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+        }
+
+
+def cache_from_env() -> ResponseCache:
+    """Cache sized from DIET_API_CACHE_SIZE (default 1024, 0 disables), DIET_API_CACHE_TTL seconds (default 3600)
+    and persisted under DIET_API_CACHE_DIR when that is set, keeping at most DIET_API_CACHE_DIR_MAX_FILES files
+    (default 10000)"""
+    return ResponseCache(
+        max_entries=int(os.environ.get("DIET_API_CACHE_SIZE", 1024)),
+        ttl=float(os.environ.get("DIET_API_CACHE_TTL", 3600)),
+        persist_dir=os.environ.get("DIET_API_CACHE_DIR") or None,
+        max_disk_entries=int(os.environ.get("DIET_API_CACHE_DIR_MAX_FILES", 10000)),
+    )
@@ -3,18 +3,28 @@ FastAPI application for Diet Recommender - Mobile App Integration
 Provides endpoints for Kotlin mobile app to get diet recommendations
 """
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field, validator
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Sequence, Tuple
 import pandas as pd
+import json
+import os
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from ai.predict import predict_and_recommend, load_artifacts, patient_row_to_features
-from utils.preprocess import compute_daily_needs, load_patients, load_recipes, clean_recipes
-from ai.recommend import recommend_top_n, filter_by_allergies_and_restrictions
-from ai.planner import make_30_day_plan
+from ai.predict import predict_and_recommend, patient_row_to_features, predict_label_probs
+from ai.features import featurize_batch
+from ai.registry import get_registry
+from utils.preprocess import compute_daily_needs, load_patients
+from utils.catalog import get_catalog, loaded_catalog, reload_catalog
+from ai.recommend import recommend_top_n, filter_by_allergies_and_restrictions, catalog_token_index
+from ai.planner import iter_plan_days
+from ai.parallel import PlanningProcessPool
+from api.workers import PoolSaturated, executor_from_env
+from api.cache import cache_key, cache_from_env
 import traceback
 
 app = FastAPI(
@@ -32,6 +42,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# trained artifacts are loaded once per process and hot-swapped when the files in models/ change
+model_registry = get_registry()
+
+# CPU-bound pipeline work runs here instead of on the event loop
+# (sized by DIET_API_WORKERS / DIET_API_MAX_QUEUE; requests beyond the queue get a 429)
+worker_pool = executor_from_env()
+
+# DIET_API_EXECUTION=process moves scoring and planning into DIET_API_PROCESSES worker processes
+# (default: one per CPU) that share the recipe arrays, so one host can use all cores
+planning_pool = None
+if os.environ.get("DIET_API_EXECUTION", "thread").lower() == "process":
+    planning_pool = PlanningProcessPool(int(os.environ["DIET_API_PROCESSES"]) if os.environ.get("DIET_API_PROCESSES") else None)
+
+# responses of the deterministic endpoints, keyed by a hash of the normalized request and the model / catalog
+# in use (DIET_API_CACHE_SIZE / DIET_API_CACHE_TTL; also kept under DIET_API_CACHE_DIR when set)
+response_cache = cache_from_env()
+
+# largest number of patients accepted by /api/v1/recommend/batch
+MAX_BATCH_SIZE = int(os.environ.get("DIET_API_MAX_BATCH", 1000))
+
+
+@app.on_event("startup")
+async def preload_resources():
+    """Warm the model registry and recipe catalog so the first request does not pay for loading them"""
+    try:
+        model_registry.load()
+    except Exception as e:
+        # keep serving; /health reports the problem and requests retry the load
+        print(f"Warning: could not load model artifacts at startup: {e}")
+    try:
+        get_catalog()
+    except Exception as e:
+        print(f"Warning: could not load recipe catalog at startup: {e}")
+
+
+@app.on_event("shutdown")
+async def release_resources():
+    """Stop planning worker processes and free their shared memory"""
+    if planning_pool is not None:
+        planning_pool.close()
+
 
 # Request Models
 class PatientInput(BaseModel):
@@ -75,6 +126,24 @@ class RecommendationRequest(BaseModel):
     no_repeat_days: int = Field(default=3, ge=0, le=14, description="Days before repeating same recipe")
 
 
+class BatchRecommendationItem(RecommendationRequest):
+    """One patient of a batch request"""
+    patient_id: str = Field(default="<mobile_user>", description="Caller's identifier, echoed back in the result")
+
+
+class BatchRecommendationRequest(BaseModel):
+    """Recommendations for many patients in one call"""
+    requests: List[BatchRecommendationItem] = Field(..., description=f"Patients to plan for (at most {MAX_BATCH_SIZE})")
+    
+    @validator('requests')
+    def validate_batch_size(cls, v):
+        if not v:
+            raise ValueError('requests must not be empty')
+        if len(v) > MAX_BATCH_SIZE:
+            raise ValueError(f'at most {MAX_BATCH_SIZE} patients per batch')
+        return v
+
+
 class QuickRecommendRequest(BaseModel):
     """Quick recommendation using essential parameters only"""
     age: int = Field(..., ge=1, le=120)
@@ -103,15 +172,23 @@ class DayPlan(BaseModel):
     meals: List[MealInfo]
 
 
-class RecommendationResponse(BaseModel):
+class RecommendationSummary(BaseModel):
     patient_id: str
     target_calories: float
     dietary_restrictions: str
     allergies: str
     total_days: int
+
+
+class RecommendationResponse(RecommendationSummary):
     meal_plan: List[DayPlan]
 
 
+class BatchRecommendationResponse(BaseModel):
+    count: int
+    results: List[RecommendationResponse]
+
+
 # Health Check
 @app.get("/", tags=["Health"])
 async def root():
@@ -122,6 +199,8 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "recommend": "/api/v1/recommend",
+            "recommend_batch": "/api/v1/recommend/batch",
+            "recommend_stream": "/api/v1/recommend/stream",
             "quick_recommend": "/api/v1/quick-recommend",
             "predict_diet_type": "/api/v1/predict-diet-type"
         }
@@ -132,12 +211,15 @@ async def root():
 async def health_check():
     """Detailed health check with model status"""
     try:
-        clf, le, feature_cols, encoders = load_artifacts()
+        clf, le, feature_cols, encoders = model_registry.get()
         return {
             "status": "healthy",
             "model_loaded": True,
+            "model_version": model_registry.version,
             "feature_count": len(feature_cols),
-            "diet_types": list(le.classes_)
+            "diet_types": list(le.classes_),
+            "workers": worker_pool.stats(),
+            "cache": response_cache.stats()
         }
     except Exception as e:
         return {
@@ -147,6 +229,56 @@ async def health_check():
         }
 
 
+def pool_busy_error() -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Server is busy generating other recommendations, please retry shortly",
+        headers={"Retry-After": "1"}
+    )
+
+
+async def run_in_worker(fn, *args):
+    """Run blocking pipeline work in the bounded worker pool; 429 when it is saturated"""
+    try:
+        return await worker_pool.run(fn, *args)
+    except PoolSaturated:
+        raise pool_busy_error()
+
+
+def response_cache_key(endpoint: str, request: BaseModel) -> Optional[str]:
+    """Cache key for request on endpoint; None (do not cache) while the model or catalog is not loaded or
+    the model files just changed"""
+    catalog = loaded_catalog()
+    fingerprint = model_registry.fingerprint
+    if not response_cache.enabled or catalog is None or fingerprint is None or model_registry.changed_on_disk():
+        return None
+    return cache_key(endpoint, request.dict(), fingerprint, catalog.fingerprint)
+
+
+async def cached_response(endpoint: str, build, request: BaseModel) -> Response:
+    """Serve a repeated request from the response cache without leaving the event loop; build misses in the worker pool"""
+    key = response_cache_key(endpoint, request)
+    if key is not None:
+        body = response_cache.get(key)
+        if body is not None:
+            return Response(content=body, media_type="application/json", headers={"X-Cache": "HIT"})
+    body = await run_in_worker(build_and_cache, endpoint, build, request, key)
+    return Response(content=body, media_type="application/json", headers={"X-Cache": "MISS"})
+
+
+def build_and_cache(endpoint: str, build, request: BaseModel, key: Optional[str]) -> bytes:
+    """JSON body of build(request), read from / written to the response cache when key is set"""
+    if key is not None:
+        body = response_cache.load(key)
+        if body is not None:
+            return body
+    body = JSONResponse(content=jsonable_encoder(build(request))).body
+    # skip storing if the model or catalog was swapped while building
+    if key is not None and response_cache_key(endpoint, request) == key:
+        response_cache.put(key, body)
+    return body
+
+
 @app.post("/api/v1/recommend", response_model=RecommendationResponse, tags=["Recommendations"])
 async def get_recommendation(request: RecommendationRequest):
     """
@@ -155,84 +287,135 @@ async def get_recommendation(request: RecommendationRequest):
     This endpoint takes detailed patient information and returns a complete
     meal plan for the specified number of days.
     """
-    try:
-        # Convert patient input to dataframe
-        patient_dict = request.patient.dict()
-        patient_dict['Patient_ID'] = '<mobile_user>'
+    return await cached_response("recommend", build_recommendation, request)
+
+
+def patient_frame(patients: List[PatientInput], patient_ids: List[str]) -> pd.DataFrame:
+    """Patients as rows with BMI and daily needs filled in"""
+    rows = []
+    for patient, patient_id in zip(patients, patient_ids):
+        patient_dict = patient.dict()
+        patient_dict['Patient_ID'] = patient_id
         
         # Calculate BMI if not provided
         if 'BMI' not in patient_dict:
             height_m = patient_dict['Height_cm'] / 100
             patient_dict['BMI'] = patient_dict['Weight_kg'] / (height_m ** 2)
-        
-        # Compute daily needs
-        patient_df = compute_daily_needs(pd.DataFrame([patient_dict]))
-        patient_row = patient_df.iloc[0]
-        
-        # Load model and predict
-        clf, le, feature_cols, encoders = load_artifacts()
-        X = patient_row_to_features(patient_row, feature_cols, encoders)
-        
-        pred_enc = clf.predict(X)[0]
-        pred_label = le.inverse_transform([pred_enc])[0]
-        
-        if hasattr(clf, 'predict_proba'):
-            probs = clf.predict_proba(X)[0]
-            label_probs = {lab: float(p) for lab, p in zip(le.classes_, probs)}
-        else:
-            label_probs = {pred_label: 1.0}
-        
-        # Get recipe recommendations
-        recipes = load_recipes()
-        recipes = clean_recipes(recipes)
-        
-        candidates = recommend_top_n(
-            recipes, 
-            patient_row, 
-            n=500, 
-            diet_label_probs=label_probs
-        )
-        plan_pool = filter_by_allergies_and_restrictions(candidates, patient_row)
-        
-        # Generate meal plan
-        plans = make_30_day_plan(
-            plan_pool, 
-            patient_row, 
+        rows.append(patient_dict)
+    
+    # Compute daily needs
+    return compute_daily_needs(pd.DataFrame(rows))
+
+
+def meal_plan_rows(catalog, patient_row: pd.Series, label_probs: Dict[str, float], request: RecommendationRequest) -> Tuple[pd.DataFrame, Iterator[Sequence[int]]]:
+    """Recommend candidates for one patient and plan the requested days.
+
+    Returns (recipes, days) where days lazily yields each day's row positions in recipes as it is planned.
+    """
+    if planning_pool is not None:
+        # score + plan in a worker process attached to the shared catalog arrays (all days at once)
+        return catalog.frame, iter(planning_pool.plan_rows(
+            catalog,
+            patient_row,
+            diet_label_probs=label_probs,
+            n=500,
             days=request.days,
             meals_per_day=request.meals_per_day,
             no_repeat_within_days=request.no_repeat_days
+        ))
+    token_index = catalog_token_index(catalog)
+    candidates = recommend_top_n(
+        catalog.frame, 
+        patient_row, 
+        n=500, 
+        diet_label_probs=label_probs,
+        index=token_index,
+        catalog=catalog
+    )
+    plan_pool = filter_by_allergies_and_restrictions(candidates, patient_row, index=token_index)
+    
+    # Generate meal plan; days are planned as they are consumed
+    days = iter_plan_days(
+        plan_pool, 
+        patient_row, 
+        days=request.days,
+        meals_per_day=request.meals_per_day,
+        no_repeat_within_days=request.no_repeat_days
+    )
+    return plan_pool, (day.rows for day in days)
+
+
+def format_day(index: int, recipes: pd.DataFrame, rows: Sequence[int]) -> DayPlan:
+    """Response model for one planned day (index counts from 0, rows are positions in recipes)"""
+    day = recipes.iloc[list(rows)]
+    day_total = float(day['calories'].sum()) if not day.empty else 0
+    
+    def column(name, default=None):
+        return day[name].tolist() if name in day.columns else [default] * len(day)
+    
+    def optional_float(value):
+        return float(value) if pd.notna(value) else None
+    
+    meals = []
+    for name, cuisine, calories, protein, carbs, fat in zip(
+            day['Recipe_name'].tolist(), column('Cuisine_type', ''), day['calories'].tolist(),
+            column('Protein(g)'), column('Carbs(g)'), column('Fat(g)')):
+        meal = MealInfo(
+            recipe_name=name,
+            cuisine_type=cuisine,
+            calories=float(calories),
+            protein=optional_float(protein),
+            carbs=optional_float(carbs),
+            fat=optional_float(fat)
         )
+        meals.append(meal)
+    
+    return DayPlan(
+        day=index + 1,
+        total_calories=day_total,
+        meals=meals
+    )
+
+
+def format_summary(patient_row: pd.Series, days: int) -> RecommendationSummary:
+    """Patient part of the response, without the meal plan"""
+    return RecommendationSummary(
+        patient_id=patient_row.get('Patient_ID', '<mobile_user>'),
+        target_calories=float(patient_row.get('target_calories', 0)),
+        dietary_restrictions=str(patient_row.get('Dietary_Restrictions', 'None')),
+        allergies=str(patient_row.get('Allergies', 'None')),
+        total_days=days
+    )
+
+
+def format_recommendation(patient_row: pd.Series, recipes: pd.DataFrame, day_rows: Iterable[Sequence[int]], days: int) -> RecommendationResponse:
+    """Response model for one patient's plan"""
+    return RecommendationResponse(
+        **format_summary(patient_row, days).dict(),
+        meal_plan=[format_day(i, recipes, rows) for i, rows in enumerate(day_rows)]
+    )
+
+
+def predict_patient(patient: PatientInput):
+    """(patient row with daily needs, diet label probabilities) for a single mobile user"""
+    patient_row = patient_frame([patient], ['<mobile_user>']).iloc[0]
+    
+    # Load model and predict
+    clf, le, feature_cols, encoders = model_registry.get()
+    X = patient_row_to_features(patient_row, feature_cols, encoders)
+    return patient_row, predict_label_probs(clf, le, X)[0]
+
+
+def build_recommendation(request: RecommendationRequest) -> RecommendationResponse:
+    """Blocking part of /api/v1/recommend: prediction, filtering and planning"""
+    try:
+        patient_row, label_probs = predict_patient(request.patient)
         
-        # Format response
-        meal_plan = []
-        for i, day in enumerate(plans):
-            day_total = float(day['calories'].sum()) if not day.empty else 0
-            meals = []
-            for _, r in day.iterrows():
-                meal = MealInfo(
-                    recipe_name=r['Recipe_name'],
-                    cuisine_type=r.get('Cuisine_type', ''),
-                    calories=float(r['calories']),
-                    protein=float(r.get('Protein(g)', 0)) if pd.notna(r.get('Protein(g)')) else None,
-                    carbs=float(r.get('Carbs(g)', 0)) if pd.notna(r.get('Carbs(g)')) else None,
-                    fat=float(r.get('Fat(g)', 0)) if pd.notna(r.get('Fat(g)')) else None
-                )
-                meals.append(meal)
-            
-            meal_plan.append(DayPlan(
-                day=i + 1,
-                total_calories=day_total,
-                meals=meals
-            ))
+        # Get recipe recommendations from the shared, pre-cleaned catalog
+        catalog = get_catalog()
+        recipes, day_rows = meal_plan_rows(catalog, patient_row, label_probs, request)
         
-        return RecommendationResponse(
-            patient_id=patient_row.get('Patient_ID', '<mobile_user>'),
-            target_calories=float(patient_row.get('target_calories', 0)),
-            dietary_restrictions=str(patient_row.get('Dietary_Restrictions', 'None')),
-            allergies=str(patient_row.get('Allergies', 'None')),
-            total_days=request.days,
-            meal_plan=meal_plan
-        )
+        return format_recommendation(patient_row, recipes, day_rows, request.days)
         
     except Exception as e:
         raise HTTPException(
@@ -241,6 +424,89 @@ async def get_recommendation(request: RecommendationRequest):
         )
 
 
+@app.post("/api/v1/recommend/stream", tags=["Recommendations"])
+async def stream_recommendation(request: RecommendationRequest):
+    """
+    Get personalized diet recommendation as a stream of days
+    
+    Newline-delimited JSON: the first line is the patient summary (the full
+    response without meal_plan), followed by one DayPlan per line as soon as
+    that day has been planned.
+    """
+    try:
+        records = worker_pool.stream(iter_recommendation, request)
+    except PoolSaturated:
+        raise pool_busy_error()
+    # prediction and candidate errors still become a regular error response
+    summary = await records.__anext__()
+    return StreamingResponse(ndjson_lines(summary, records), media_type="application/x-ndjson")
+
+
+async def ndjson_lines(first: BaseModel, rest):
+    yield json.dumps(jsonable_encoder(first)) + "\n"
+    try:
+        async for record in rest:
+            yield json.dumps(jsonable_encoder(record)) + "\n"
+    except Exception as e:
+        # the status line is already sent; report the failure in-band
+        yield json.dumps({"error": f"Error generating recommendation: {str(e)}"}) + "\n"
+    finally:
+        await rest.aclose()
+
+
+def iter_recommendation(request: RecommendationRequest) -> Iterator[BaseModel]:
+    """Blocking part of /api/v1/recommend/stream: the RecommendationSummary, then one DayPlan per planned day"""
+    try:
+        patient_row, label_probs = predict_patient(request.patient)
+        recipes, day_rows = meal_plan_rows(get_catalog(), patient_row, label_probs, request)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating recommendation: {str(e)}\n{traceback.format_exc()}"
+        )
+    yield format_summary(patient_row, request.days)
+    for i, rows in enumerate(day_rows):
+        yield format_day(i, recipes, rows)
+
+
+@app.post("/api/v1/recommend/batch", response_model=BatchRecommendationResponse, tags=["Recommendations"])
+async def get_batch_recommendation(request: BatchRecommendationRequest):
+    """
+    Get meal plans for many patients in one call
+    
+    The diet type model runs once over all patients and the recipe catalog
+    and allergy filters are shared between them. Results are returned in
+    request order.
+    """
+    return await run_in_worker(build_batch_recommendation, request)
+
+
+def build_batch_recommendation(request: BatchRecommendationRequest) -> BatchRecommendationResponse:
+    """Blocking part of /api/v1/recommend/batch"""
+    try:
+        items = request.requests
+        patients = patient_frame([item.patient for item in items], [item.patient_id for item in items])
+        
+        # one feature matrix and one predict_proba call for the whole batch
+        clf, le, feature_cols, encoders = model_registry.get()
+        X = featurize_batch(patients, feature_cols, encoders)
+        all_label_probs = predict_label_probs(clf, le, X)
+        
+        catalog = get_catalog()
+        results = []
+        for (_, patient_row), label_probs, item in zip(patients.iterrows(), all_label_probs, items):
+            recipes, day_rows = meal_plan_rows(catalog, patient_row, label_probs, item)
+            results.append(format_recommendation(patient_row, recipes, day_rows, item.days))
+        
+        return BatchRecommendationResponse(count=len(results), results=results)
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating batch recommendation: {str(e)}\n{traceback.format_exc()}"
+        )
+
+
 @app.post("/api/v1/quick-recommend", tags=["Recommendations"])
 async def quick_recommend(request: QuickRecommendRequest):
     """
@@ -278,13 +544,14 @@ async def quick_recommend(request: QuickRecommendRequest):
             no_repeat_days=3
         )
         
-        return await get_recommendation(full_request)
-        
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error in quick recommendation: {str(e)}"
         )
+    
+    # same plan as the equivalent full request, so both endpoints share cache entries
+    return await cached_response("recommend", build_recommendation, full_request)
 
 
 @app.post("/api/v1/predict-diet-type", tags=["Predictions"])
@@ -295,6 +562,11 @@ async def predict_diet_type(patient: PatientInput):
     Returns the predicted diet category (e.g., Low-Carb, Mediterranean, etc.)
     along with confidence scores for all diet types.
     """
+    return await cached_response("predict-diet-type", build_diet_prediction, patient)
+
+
+def build_diet_prediction(patient: PatientInput) -> dict:
+    """Blocking part of /api/v1/predict-diet-type"""
     try:
         patient_dict = patient.dict()
         patient_dict['Patient_ID'] = '<prediction_user>'
@@ -308,7 +580,7 @@ async def predict_diet_type(patient: PatientInput):
         patient_row = patient_df.iloc[0]
         
         # Load model and predict
-        clf, le, feature_cols, encoders = load_artifacts()
+        clf, le, feature_cols, encoders = model_registry.get()
         X = patient_row_to_features(patient_row, feature_cols, encoders)
         
         pred_enc = clf.predict(X)[0]
@@ -341,6 +613,25 @@ async def predict_diet_type(patient: PatientInput):
         )
 
 
+@app.post("/api/v1/catalog/reload", tags=["Health"])
+async def reload_recipe_catalog():
+    """Re-read the recipe CSV and swap the new catalog in for subsequent requests"""
+    try:
+        catalog = await run_in_worker(reload_catalog)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error reloading recipe catalog: {str(e)}"
+        )
+    return {
+        "status": "reloaded",
+        "catalog_version": catalog.version,
+        "recipe_count": len(catalog)
+    }
+
+
 def get_bmi_category(bmi: float) -> str:
     """Categorize BMI value"""
     if bmi < 18.5:
@@ -0,0 +1,116 @@
+"""
+Bounded worker pool for the CPU-bound recommendation pipeline.
+Keeps pandas / sklearn work off the event loop and rejects work once the queue is full.
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PoolSaturated(Exception):
+    """Raised when every worker is busy and the wait queue is full"""
+
+
+class BoundedExecutor:
+    """Thread pool with at most max_workers jobs running and max_queue jobs waiting.
+
+    A job counts against the limit until it has actually finished running, even if the request that
+    submitted it was cancelled in the meantime.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, thread_name_prefix: str = "diet-worker"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Jobs running or waiting"""
+        return self._pending
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise PoolSaturated(f"{self._pending} jobs already running or queued")
+            self._pending += 1
+        try:
+            future = self._executor.submit(functools.partial(fn, *args, **kwargs))
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) in the pool and await its result"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stream(self, gen_fn, *args, **kwargs):
+        """Run the generator gen_fn(*args, **kwargs) in the pool and return an async iterator over its items.
+
+        The job is submitted right away, so PoolSaturated is raised by this call rather than while iterating.
+        Items arrive as soon as the generator yields them; closing the iterator early stops the generator at
+        its next item.
+        """
+        loop = asyncio.get_running_loop()
+        items = asyncio.Queue()
+        stop = threading.Event()
+
+        def send(kind, value=None):
+            try:
+                loop.call_soon_threadsafe(items.put_nowait, (kind, value))
+            except RuntimeError:
+                # event loop already closed
+                stop.set()
+
+        def produce():
+            try:
+                for item in gen_fn(*args, **kwargs):
+                    if stop.is_set():
+                        return
+                    send("item", item)
+            except BaseException as e:
+                send("error", e)
+            finally:
+                send("done")
+
+        self.submit(produce)
+
+        async def consume():
+            try:
+                while True:
+                    kind, value = await items.get()
+                    if kind == "error":
+                        raise value
+                    if kind == "done":
+                        return
+                    yield value
+            finally:
+                stop.set()
+
+        return consume()
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+        }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+def executor_from_env() -> BoundedExecutor:
+    """Pool sized from DIET_API_WORKERS (default: CPU count, at most 4) and DIET_API_MAX_QUEUE (default 16)"""
+    workers = int(os.environ.get("DIET_API_WORKERS", min(4, os.cpu_count() or 1)))
+    max_queue = int(os.environ.get("DIET_API_MAX_QUEUE", 16))
+    return BoundedExecutor(max_workers=max(1, workers), max_queue=max(0, max_queue))
@@ -0,0 +1,59 @@
+import os
+import time
+from api.cache import ResponseCache, cache_key
+
+
+def test_cache_key_ignores_dict_order_and_tracks_versions():
+    a = cache_key('recommend', {'days': 7, 'patient': {'Age': 30, 'Gender': 'Male'}}, 'model-1', 'catalog-1')
+    b = cache_key('recommend', {'patient': {'Gender': 'Male', 'Age': 30}, 'days': 7}, 'model-1', 'catalog-1')
+    assert a == b
+    assert a != cache_key('recommend', {'days': 7, 'patient': {'Age': 30, 'Gender': 'Male'}}, 'model-2', 'catalog-1')
+    assert a != cache_key('predict-diet-type', {'days': 7, 'patient': {'Age': 30, 'Gender': 'Male'}}, 'model-1', 'catalog-1')
+
+
+def test_response_cache_lru_and_ttl():
+    cache = ResponseCache(max_entries=2, ttl=60)
+    cache.put('a', b'1')
+    cache.put('b', b'2')
+    assert cache.get('a') == b'1'
+    # 'b' is now least recently used
+    cache.put('c', b'3')
+    assert cache.get('b') is None
+    assert cache.get('a') == b'1' and cache.get('c') == b'3'
+
+    cache.ttl = 0.01
+    time.sleep(0.02)
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 1
+
+
+def test_response_cache_persists_across_instances(tmp_path):
+    ResponseCache(persist_dir=str(tmp_path)).put('k', b'{"x":1}')
+    fresh = ResponseCache(persist_dir=str(tmp_path))
+    assert fresh.get('k') is None
+    assert fresh.load('k') == b'{"x":1}'
+    assert fresh.get('k') == b'{"x":1}'
+
+    path = os.path.join(str(tmp_path), 'k.json')
+    os.utime(path, (time.time() - 10, time.time() - 10))
+    assert ResponseCache(ttl=5, persist_dir=str(tmp_path)).load('k') is None
+    assert not os.path.exists(path)
+
+
+def test_response_cache_sweeps_disk(tmp_path):
+    cache = ResponseCache(ttl=5, persist_dir=str(tmp_path), max_disk_entries=3, sweep_interval=3600)
+    for i in range(3):
+        cache.put(f'old{i}', b'{}')
+        past = time.time() - 10
+        os.utime(os.path.join(str(tmp_path), f'old{i}.json'), (past, past))
+    # expired entries that are never read again are removed by the next sweep
+    cache.sweep()
+    assert os.listdir(str(tmp_path)) == []
+
+    # writing past the cap triggers a sweep that keeps only the newest files
+    for i in range(5):
+        cache.put(f'k{i}', b'{}')
+        stamp = time.time() - 4 + i * 0.5
+        os.utime(os.path.join(str(tmp_path), f'k{i}.json'), (stamp, stamp))
+    assert sorted(os.listdir(str(tmp_path))) == ['k2.json', 'k3.json', 'k4.json']
+    assert cache.stats()['disk_files'] == 3
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+from utils.catalog import build_catalog
+from utils.recipe_store import build_recipe_store, load_recipe_store, store_dir_for
+
+
+def test_catalog_is_cleaned_once(tmp_path):
+    path = tmp_path / 'recipes.csv'
+    pd.DataFrame([
+        {"Recipe_name": " Apple Pie ", "Diet_type": "Paleo", "Cuisine_type": "American", "Protein(g)": 2, "Carbs(g)": 40, "Fat(g)": 10},
+        {"Recipe_name": "Apple Pie", "Diet_type": "Paleo", "Cuisine_type": "American", "Protein(g)": 2, "Carbs(g)": 40, "Fat(g)": 10},
+        {"Recipe_name": "Tofu Bowl", "Diet_type": "Vegan", "Cuisine_type": "Asian", "Protein(g)": 20, "Carbs(g)": 30, "Fat(g)": 5000},
+    ]).to_csv(path, index=False)
+    catalog = build_catalog(str(path))
+    assert list(catalog.frame['Recipe_name']) == ['Apple Pie', 'Tofu Bowl']
+    assert catalog.frame['calories'].tolist() == [258.0, 200.0]
+    assert catalog.text['Cuisine_type'] == ['american', 'asian']
+    # derived structures are built once per catalog
+    calls = []
+    assert catalog.derived('n', lambda c: calls.append(1) or len(c)) == 2
+    assert catalog.derived('n', lambda c: calls.append(1) or len(c)) == 2
+    assert len(calls) == 1
+    assert build_catalog(str(path)).version != catalog.version
+
+
+def test_catalog_from_columnar_store(tmp_path):
+    path = tmp_path / 'recipes.csv'
+    pd.DataFrame([
+        {"Recipe_name": "Tofu Bowl", "Diet_type": "Vegan", "Cuisine_type": "Asian", "Protein(g)": 20, "Carbs(g)": 30, "Fat(g)": 5},
+        {"Recipe_name": "Tofu Bowl", "Diet_type": "Vegan", "Cuisine_type": "Asian", "Protein(g)": 20, "Carbs(g)": 30, "Fat(g)": 5},
+        {"Recipe_name": "Plain Rice", "Diet_type": "DASH", "Cuisine_type": None, "Protein(g)": None, "Carbs(g)": 45, "Fat(g)": 1},
+    ]).to_csv(path, index=False)
+    from_csv = build_catalog(str(path))
+    build_recipe_store(str(path))
+    stored = load_recipe_store(store_dir_for(str(path)), source_path=str(path))
+    assert stored is not None
+    # numeric columns stay backed by the mapped file
+    arr = stored[0]['calories'].to_numpy()
+    while arr is not None and not isinstance(arr, np.memmap):
+        arr = arr.base
+    assert arr is not None
+
+    catalog = build_catalog(str(path))
+    pd.testing.assert_frame_equal(catalog.frame, from_csv.frame)
+    assert catalog.text == from_csv.text
+    assert catalog.text['Cuisine_type'] == ['asian', 'nan']
+
+    # a store older than its CSV is ignored
+    with open(path, 'a', encoding='utf8') as fh:
+        fh.write("Kale Salad,Vegan,American,5,10,7\n")
+    assert load_recipe_store(store_dir_for(str(path)), source_path=str(path)) is None
+    assert len(build_catalog(str(path))) == 3
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+from utils.catalog import RecipeCatalog
+from ai.parallel import SharedCatalogArrays, recommend_and_plan_task
+from ai.recommend import recommend_top_n, filter_by_allergies_and_restrictions, catalog_token_index, catalog_diet_label_boosts, cuisine_match_mask, target_carbs_pct_for
+from ai.planner import make_30_day_plan
+
+
+def test_shared_array_task_matches_dataframe_pipeline():
+    rng = np.random.default_rng(0)
+    n = 300
+    frame = pd.DataFrame({
+        'Recipe_name': [f"{w} dish {i}" for i, w in enumerate(rng.choice(['peanut', 'tofu', 'beef', 'rice'], n))],
+        'Diet_type': rng.choice(['paleo', 'vegan', 'low carb'], n),
+        'Cuisine_type': rng.choice(['mexican', 'italian'], n),
+        'Protein(g)': rng.uniform(0, 60, n),
+        'Carbs(g)': rng.uniform(0, 120, n),
+        'Fat(g)': rng.uniform(0, 50, n),
+    })
+    frame['calories'] = (frame['Protein(g)'] + frame['Carbs(g)']) * 4 + frame['Fat(g)'] * 9
+    catalog = RecipeCatalog(frame)
+    patient = pd.Series({'Allergies': 'Peanuts', 'Dietary_Restrictions': 'beef', 'target_calories': 2100,
+                         'Preferred_Cuisine': 'Mexican', 'Diet_Recommendation': 'Low_Carb'})
+    probs = {'Low_Carb': 0.6, 'Balanced': 0.4}
+
+    index = catalog_token_index(catalog)
+    cand = recommend_top_n(frame, patient, n=50, diet_label_probs=probs, index=index)
+    expected = make_30_day_plan(filter_by_allergies_and_restrictions(cand, patient, index=index), patient, days=5, meals_per_day=3, no_repeat_within_days=2)
+
+    shared = SharedCatalogArrays(catalog)
+    try:
+        days = recommend_and_plan_task(
+            shared.spec, np.packbits(index.exclusion_mask(patient)), np.packbits(cuisine_match_mask(frame, patient)),
+            catalog_diet_label_boosts(catalog, probs), 2100 / 3.0, target_carbs_pct_for(patient), 50, 2100 / 3.0, 5, 3, 2)
+    finally:
+        shared.close()
+    assert [list(frame['Recipe_name'].iloc[d]) for d in days] == [list(d['Recipe_name']) for d in expected]
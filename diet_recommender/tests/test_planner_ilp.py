@@ -0,0 +1,91 @@
+import pandas as pd
+import pytest
+from ai.planner_ilp import make_plan_ilp
+
+pulp = pytest.importorskip('pulp')
+
+
+def test_ilp_plan_respects_no_repeat_window():
+    recipes = pd.DataFrame([{"Recipe_name": f"r{i}", "calories": 400 + 10 * i} for i in range(40)])
+    patient = pd.Series({'target_calories': 1500})
+    plans = make_plan_ilp(recipes, patient, days=4, meals_per_day=3, no_repeat_within_days=1, max_candidates=10)
+    slots = [name for day in plans for name in day['Recipe_name']]
+    assert len(slots) == 12
+    window = 1 * 3 + 1
+    for s in range(len(slots)):
+        assert slots[s] not in slots[s + 1:s + window]
+    # the best-fitting recipes are used
+    assert 'r10' in slots
+
+
+def test_greedy_warm_start_is_feasible():
+    import numpy as np
+    from ai.planner_ilp import greedy_warm_start
+    # a zero calorie gap stays zero under the repeat penalty, so greedy alone picks row 0 every day
+    calories = np.array([500.0, 300.0, 200.0, 100.0, 50.0])
+    start = greedy_warm_start(calories, np.arange(5), 500.0, days=6, meals_per_day=1, no_repeat_within_days=2, window=3)
+    assert len(start) == 6
+    for s in range(len(start)):
+        assert start[s] not in start[s + 1:s + 3]
+
+
+def test_ilp_raises_when_pool_too_small():
+    import numpy as np
+    from ai.planner_ilp import greedy_warm_start
+    # a window of 4 meals needs at least 4 distinct recipes
+    recipes = pd.DataFrame([{"Recipe_name": f"r{i}", "calories": 400 + 10 * i} for i in range(3)])
+    patient = pd.Series({'target_calories': 1500})
+    with pytest.raises(RuntimeError):
+        make_plan_ilp(recipes, patient, days=4, meals_per_day=3, no_repeat_within_days=1)
+    with pytest.raises(RuntimeError):
+        greedy_warm_start(np.array([500.0, 400.0]), np.arange(2), 500.0, days=3, meals_per_day=1, no_repeat_within_days=2, window=3)
+
+
+def test_ilp_solves_with_time_limit(monkeypatch):
+    solved = []
+    solve = pulp.LpProblem.solve
+
+    def record(self, *args, **kwargs):
+        status = solve(self, *args, **kwargs)
+        solved.append(self)
+        return status
+
+    monkeypatch.setattr(pulp.LpProblem, 'solve', record)
+    recipes = pd.DataFrame([{"Recipe_name": f"r{i}", "calories": 300 + 7 * i} for i in range(60)])
+    patient = pd.Series({'target_calories': 2000})
+    plans = make_plan_ilp(recipes, patient, days=10, meals_per_day=4, no_repeat_within_days=2, time_limit=1, gap_rel=0.05, threads=1)
+    assert [len(day) for day in plans] == [4] * 10
+    # this instance is small enough for CBC to finish well within the limit
+    assert solved[0].status == pulp.LpStatusOptimal
+
+
+def test_ilp_accepts_time_limited_incumbent(monkeypatch):
+    solve = pulp.LpProblem.solve
+
+    def stopped_on_time(self, *args, **kwargs):
+        # what pulp reports when CBC hits timeLimit holding a feasible, unproven incumbent
+        solve(self, *args, **kwargs)
+        self.status = pulp.LpStatusNotSolved
+        self.sol_status = pulp.LpSolutionIntegerFeasible
+        return self.status
+
+    monkeypatch.setattr(pulp.LpProblem, 'solve', stopped_on_time)
+    recipes = pd.DataFrame([{"Recipe_name": f"r{i}", "calories": 300 + 7 * i} for i in range(60)])
+    patient = pd.Series({'target_calories': 2000})
+    plans = make_plan_ilp(recipes, patient, days=10, meals_per_day=4, no_repeat_within_days=2, time_limit=1, threads=1)
+    slots = [name for day in plans for name in day['Recipe_name']]
+    assert len(slots) == 40
+    window = 2 * 4 + 1
+    for s in range(len(slots)):
+        assert slots[s] not in slots[s + 1:s + window]
+
+    # no incumbent at all: the caller gets the documented RuntimeError
+    def stopped_without_solution(self, *args, **kwargs):
+        solve(self, *args, **kwargs)
+        self.status = pulp.LpStatusNotSolved
+        self.sol_status = pulp.LpSolutionNoSolutionFound
+        return self.status
+
+    monkeypatch.setattr(pulp.LpProblem, 'solve', stopped_without_solution)
+    with pytest.raises(RuntimeError):
+        make_plan_ilp(recipes, patient, days=10, meals_per_day=4, no_repeat_within_days=2, time_limit=1, threads=1)
@@ -1,5 +1,6 @@
 import pandas as pd
-from planner import make_30_day_plan
+import numpy as np
+from ai.planner import make_30_day_plan
 
 
 def test_planner_variety():
@@ -13,3 +14,51 @@ def test_planner_variety():
         for _, r in day.iterrows():
             used.add(r['Recipe_name'])
     assert len(used) >= 5  # across 5 days we should use at least 5 different recipes
+
+
+def test_plan_positions_blocks_recent_repeats():
+    from ai.planner import plan_positions
+    # recipe 0 is the best fit; the repeat penalty must push it out of the following day
+    calories = np.array([510.0, 480.0, 470.0, 460.0])
+    codes = np.arange(4)
+    days = plan_positions(calories, codes, 500.0, days=6, meals_per_day=1, no_repeat_within_days=3)
+    picks = [d[0] for d in days]
+    assert picks[:3] == [0, 1, 0]
+    assert all(a != b for a, b in zip(picks, picks[1:]))
+
+
+def test_best_band_orders_only_close_scores():
+    from ai.planner import best_band
+    scores = np.array([104.0, 300.0, 100.0, 105.0, 104.0, 106.0])
+    band = best_band(scores, np.arange(6), tolerance=1.05, tie_keys=np.array([0, 1, 2, 3, 1, 4]))
+    assert band.tolist() == [2, 0, 4, 3]
+
+
+def test_iter_day_plans_matches_full_plan_and_stops_early():
+    from ai.planner import iter_day_plans
+    rng = np.random.default_rng(1)
+    recipes = pd.DataFrame({'Recipe_name': [f"r{i % 25}" for i in range(40)], 'calories': rng.uniform(300, 700, 40)})
+    patient = pd.Series({'target_calories': 1800})
+    plans = make_30_day_plan(recipes, patient, days=10, meals_per_day=3, no_repeat_within_days=4)
+    days = iter_day_plans(recipes, patient, days=10, meals_per_day=3, no_repeat_within_days=4)
+    for expected in plans[:4]:
+        pd.testing.assert_frame_equal(next(days), expected)
+    days.close()
+
+
+def test_plan_day_records_page_lazily_and_expand_to_frames():
+    import itertools
+    from ai.planner import iter_plan_days, day_frame
+    rng = np.random.default_rng(2)
+    names = [f"r{i % 20}" for i in range(30)]
+    names[3] = None  # unnamed rows are skipped, positions still refer to the input frame
+    recipes = pd.DataFrame({'Recipe_name': names, 'calories': rng.uniform(300, 700, 30)}, index=np.arange(100, 130))
+    patient = pd.Series({'target_calories': 2000})
+    plans = make_30_day_plan(recipes, patient, days=12, meals_per_day=4, no_repeat_within_days=5)
+
+    page = list(itertools.islice(iter_plan_days(recipes, patient, days=12, meals_per_day=4, no_repeat_within_days=5), 8, 12))
+    assert len(page) == 4
+    for record, expected in zip(page, plans[8:12]):
+        assert 3 not in record.rows
+        assert recipes.index[list(record.rows)].tolist() == expected.index.tolist()
+        pd.testing.assert_frame_equal(day_frame(recipes, record, patient, meals_per_day=4), expected)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder
+from ai.features import featurize_batch
+from ai.predict import patient_row_to_features, predict_label_probs
+
+
+def test_batch_prediction_matches_single_rows():
+    patients = pd.DataFrame({
+        'Age': [25, 40, 61], 'Weight_kg': [60.0, 85.0, 72.0], 'Height_cm': [165.0, 180.0, 170.0],
+        'BMI': [22.0, 26.2, 24.9], 'Gender': ['Female', 'Male', 'Other'],
+        'Physical_Activity_Level': ['Active', 'Sedentary', 'Moderate'],
+        'Weekly_Exercise_Hours': [5, 0, 2], 'Adherence_to_Diet_Plan': [80, 50, 70],
+        'Dietary_Nutrient_Imbalance_Score': [1, 5, 3],
+    })
+    gender = LabelEncoder().fit(['Female', 'Male'])
+    feature_cols = ['Age', 'BMI', 'target_calories', 'Gender_enc']
+    encoders = {'Gender': gender}
+
+    X = featurize_batch(patients, feature_cols, encoders)
+    singles = [patient_row_to_features(row, feature_cols, encoders) for _, row in patients.iterrows()]
+    pd.testing.assert_frame_equal(X, pd.concat(singles, ignore_index=True))
+    # unseen category falls back to code 0
+    assert X['Gender_enc'].tolist() == [0, 1, 0]
+
+    le = LabelEncoder().fit(['Balanced', 'Low_Carb'])
+    rng = np.random.default_rng(0)
+    clf = RandomForestClassifier(n_estimators=5, random_state=0).fit(rng.uniform(0, 3000, (40, 4)), rng.integers(0, 2, 40))
+    batch = predict_label_probs(clf, le, X)
+    assert len(batch) == 3
+    for probs, single in zip(batch, singles):
+        assert probs == predict_label_probs(clf, le, single)[0]
+        assert set(probs) == {'Balanced', 'Low_Carb'}
+
+
+def test_featurize_batch_unseen_and_missing_values():
+    patients = pd.DataFrame({
+        'Age': [30, 45], 'Weight_kg': [70.0, 90.0], 'Height_cm': [175.0, 160.0], 'BMI': [22.9, np.nan],
+        'Gender': ['Male', 'Other'], 'Disease_Type': [np.nan, 'Diabetes'], 'Physical_Activity_Level': [np.nan, 'Very Active'],
+        'Daily_Caloric_Intake': [np.nan, 1800],
+    })
+    encoders = {
+        'Gender': LabelEncoder().fit(['Female', 'Male']),
+        'Disease_Type': LabelEncoder().fit(['Diabetes', 'None', 'nan']),
+        'Smoking_Status': LabelEncoder().fit(['No', 'Yes']),
+    }
+    feature_cols = ['BMI', 'Weekly_Exercise_Hours', 'target_calories', 'Gender_enc', 'Disease_Type_enc', 'Smoking_Status_enc']
+    X = featurize_batch(patients, feature_cols, encoders)
+    assert list(X.columns) == feature_cols
+    assert np.isnan(X['BMI'].iloc[1])
+    # missing numeric column -> 0, missing categorical column -> unseen '' -> 0
+    assert X['Weekly_Exercise_Hours'].tolist() == [0.0, 0.0]
+    assert X['Smoking_Status_enc'].tolist() == [0, 0]
+    assert X['Gender_enc'].tolist() == [1, 0]
+    # NaN is looked up as the string 'nan'
+    assert X['Disease_Type_enc'].tolist() == [2, 0]
+    # male, sedentary factor for a missing activity level; explicit intake wins
+    assert X['target_calories'].tolist() == [round((700 + 1093.75 - 150 + 5) * 1.2), 1800.0]
@@ -1,5 +1,5 @@
 import pandas as pd
-from preprocess import compute_daily_needs
+from utils.preprocess import compute_daily_needs
 
 
 def test_compute_daily_needs_basic():
@@ -7,3 +7,19 @@ def test_compute_daily_needs_basic():
     out = compute_daily_needs(df)
     assert 'estimated_daily_calories' in out.columns
     assert out.iloc[0]['target_calories'] > 0
+
+
+def test_compute_daily_needs_matches_row_formula():
+    df = pd.DataFrame({
+        "Age": [30, 52, 41, 25], "Weight_kg": [70, 64.5, 88, 55], "Height_cm": [175, 160, 181, 158],
+        "Gender": ["Male", " female", None, "F"],
+        "Physical_Activity_Level": ["Moderate", "Very Active", None, "Lightly moving"],
+        "Daily_Caloric_Intake": [None, 1900, None, "n/a"],
+    })
+    out = compute_daily_needs(df)
+    expected_bmr = [10 * 70 + 6.25 * 175 - 5 * 30 + 5, 10 * 64.5 + 6.25 * 160 - 5 * 52 - 161,
+                    10 * 88 + 6.25 * 181 - 5 * 41 + 5, 10 * 55 + 6.25 * 158 - 5 * 25 - 161]
+    assert out['BMR'].tolist() == expected_bmr
+    assert out['activity_factor'].tolist() == [1.55, 1.725, 1.2, 1.375]
+    assert out['target_calories'].iloc[1] == 1900
+    assert out['target_calories'].iloc[3] == round(expected_bmr[3] * 1.375)
@@ -1,5 +1,5 @@
 import pandas as pd
-from recommend import filter_by_allergies_and_restrictions
+from ai.recommend import filter_by_allergies_and_restrictions
 
 
 def test_filter_allergies():
@@ -10,3 +10,30 @@ def test_filter_allergies():
     names = list(out['Recipe_name'])
     assert 'Peanut Butter Cookies' not in names
     assert 'Apple Pie' in names
+
+
+def test_filter_synonyms_and_prebuilt_index():
+    from ai.recommend import RecipeTokenIndex
+    data = [{"Recipe_name":"Cheese Omelette","Diet_type":"keto"},{"Recipe_name":"Grilled Shrimp","Diet_type":"paleo"},{"Recipe_name":"Green Salad","Diet_type":"vegan"}]
+    df = pd.DataFrame(data)
+    index = RecipeTokenIndex.from_frame(df)
+    patient = pd.Series({'Allergies':'Milk', 'Dietary_Restrictions':'shrimps'})
+    assert list(filter_by_allergies_and_restrictions(df, patient)['Recipe_name']) == ['Green Salad']
+    # a slice of the indexed frame is filtered through the same index
+    subset = df.iloc[[2, 0]]
+    assert list(filter_by_allergies_and_restrictions(subset, patient, index=index)['Recipe_name']) == ['Green Salad']
+
+
+def test_index_caches_term_masks():
+    from ai.recommend import RecipeTokenIndex
+    df = pd.DataFrame([{"Recipe_name":"Peanut Noodles"},{"Recipe_name":"Egg Fried Rice"},{"Recipe_name":"Plain Rice"}])
+    index = RecipeTokenIndex.from_frame(df)
+    index.mask_cache_size = 2
+    m1 = index.term_mask('allergy', 'peanuts')
+    assert index.term_mask('allergy', 'peanuts') is m1
+    index.term_mask('allergy', 'egg')
+    index.term_mask('restriction', 'rice')
+    # least recently used entry was evicted
+    assert ('allergy', 'peanuts') not in index._masks
+    mask = index.exclusion_mask(pd.Series({'Allergies': 'Peanuts, Egg', 'Dietary_Restrictions': 'None'}))
+    assert mask.tolist() == [True, True, False]
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+from utils.catalog import RecipeCatalog
+from ai.recommend import score_recipe_for_patient, score_recipes_for_patient, diet_label_boosts, recommend_top_n, catalog_token_index
+
+
+def test_vectorized_scores_match_row_scores():
+    recipes = pd.DataFrame([
+        {"Recipe_name": "Low Carb Salad", "Diet_type": "keto", "Cuisine_type": "Mexican", "Protein(g)": 30, "Carbs(g)": 10, "Fat(g)": 20, "calories": 340},
+        {"Recipe_name": "Pasta", "Diet_type": "mediterranean", "Cuisine_type": "italian", "Protein(g)": 15, "Carbs(g)": 90, "Fat(g)": 12, "calories": 528},
+        {"Recipe_name": "Broth", "Diet_type": np.nan, "Cuisine_type": np.nan, "Protein(g)": np.nan, "Carbs(g)": 0.1, "Fat(g)": 0, "calories": 0.4},
+        {"Recipe_name": "Huge Stew", "Diet_type": "paleo", "Cuisine_type": "Tex-Mexican", "Protein(g)": 150, "Carbs(g)": 200, "Fat(g)": 90, "calories": 2210},
+    ])
+    patients = [
+        pd.Series({'Preferred_Cuisine': 'Mexican', 'Diet_Recommendation': 'Low_Carb'}),
+        pd.Series({'Preferred_Cuisine': np.nan, 'Diet_Recommendation': 'Balanced'}),
+        pd.Series({}, dtype=object),
+    ]
+    for patient in patients:
+        expected = [score_recipe_for_patient(r, patient, 600) for _, r in recipes.iterrows()]
+        assert score_recipes_for_patient(recipes, patient, 600).tolist() == expected
+
+    boosts = diet_label_boosts(recipes, {'Low_Carb': 0.5, 'Mediterranean': 0.3, 'Balanced': 0.2})
+    assert boosts.tolist() == [1.5, 1.3, 1.0, 1.0]
+    assert diet_label_boosts(recipes, None).tolist() == [1.0] * 4
+
+
+def test_catalog_shortlist_matches_full_ranking():
+    rng = np.random.default_rng(7)
+    n = 2000
+    frame = pd.DataFrame({
+        'Recipe_name': [f"{w} dish {i}" for i, w in enumerate(rng.choice(['peanut', 'tofu', 'beef', 'rice', 'balanced'], n))],
+        'Diet_type': rng.choice(['paleo', 'vegan', 'low carb', 'dash'], n),
+        'Cuisine_type': rng.choice(['mexican', 'Tex-Mexican', 'italian', None], n),
+        # rounded macros so some recipes tie exactly
+        'Protein(g)': rng.integers(0, 60, n).astype(float),
+        'Carbs(g)': rng.integers(0, 120, n).astype(float),
+        'Fat(g)': rng.integers(0, 50, n).astype(float),
+    })
+    frame.loc[::97, 'Protein(g)'] = np.nan
+    frame['calories'] = (frame['Protein(g)'].fillna(0) + frame['Carbs(g)']) * 4 + frame['Fat(g)'] * 9
+    catalog = RecipeCatalog(frame)
+    index = catalog_token_index(catalog)
+    patients = [
+        pd.Series({'target_calories': 2100, 'Allergies': 'Peanuts', 'Preferred_Cuisine': 'Mexican', 'Diet_Recommendation': 'Low_Carb'}),
+        pd.Series({'target_calories': 1500, 'Dietary_Restrictions': 'beef', 'Preferred_Cuisine': np.nan}),
+        pd.Series({'target_calories': 3000, 'Diet_Recommendation': 'Balanced'}),
+    ]
+    for patient in patients:
+        for probs in [None, {'Low_Carb': 0.6, 'Balanced': 0.3, 'Vegan': 0.1}]:
+            for top in [1, 25, 400, 5000]:
+                full = recommend_top_n(frame, patient, n=top, diet_label_probs=probs, index=index)
+                short = recommend_top_n(frame, patient, n=top, diet_label_probs=probs, index=index, catalog=catalog)
+                pd.testing.assert_frame_equal(short, full)
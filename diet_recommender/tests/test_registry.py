@@ -0,0 +1,24 @@
+import json
+import os
+from ai.model_utils import save_model
+from ai.registry import ModelRegistry
+
+
+def write_artifacts(model_dir, tag):
+    save_model({'tag': tag}, os.path.join(model_dir, 'rf_diet_recommender.joblib'))
+    save_model(['Balanced'], os.path.join(model_dir, 'label_encoder.joblib'))
+    with open(os.path.join(model_dir, 'feature_cols.json'), 'w', encoding='utf8') as fh:
+        json.dump(['Age'], fh)
+
+
+def test_registry_caches_and_hot_swaps(tmp_path):
+    write_artifacts(tmp_path, 'v1')
+    reg = ModelRegistry(str(tmp_path), check_interval=0)
+    first = reg.get()
+    assert first[0]['tag'] == 'v1'
+    # unchanged files -> same objects, no reload
+    assert reg.get() is first
+    write_artifacts(tmp_path, 'v2-longer')
+    second = reg.get()
+    assert second[0]['tag'] == 'v2-longer'
+    assert reg.version == 2
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+import time
+import pytest
+from api.workers import BoundedExecutor, PoolSaturated
+
+
+def test_bounded_executor_rejects_when_saturated():
+    pool = BoundedExecutor(max_workers=1, max_queue=1)
+    gate = threading.Event()
+    running = pool.submit(gate.wait)
+    queued = pool.submit(lambda: 42)
+    with pytest.raises(PoolSaturated):
+        pool.submit(lambda: 0)
+    gate.set()
+    assert queued.result(timeout=5) == 42
+    running.result(timeout=5)
+    # slots are released by done-callbacks, which may run just after result() returns
+    for _ in range(100):
+        if pool.pending == 0:
+            break
+        time.sleep(0.01)
+    assert pool.pending == 0
+    assert pool.submit(lambda: 1).result(timeout=5) == 1
+    pool.shutdown()
+
+
+def test_bounded_executor_streams_generator_items():
+    pool = BoundedExecutor(max_workers=1, max_queue=0)
+    produced = []
+
+    def numbers():
+        for i in range(100):
+            produced.append(i)
+            time.sleep(0.005)
+            yield i
+
+    async def first_three():
+        items = pool.stream(numbers)
+        # the only worker is busy streaming
+        with pytest.raises(PoolSaturated):
+            pool.submit(lambda: 0)
+        out = []
+        async for i in items:
+            out.append(i)
+            if len(out) == 3:
+                break
+        await items.aclose()
+        return out
+
+    assert asyncio.run(first_three()) == [0, 1, 2]
+    for _ in range(100):
+        if pool.pending == 0:
+            break
+        time.sleep(0.01)
+    # closing the iterator stopped the generator instead of running it to the end
+    assert pool.pending == 0 and len(produced) < 100
+    pool.shutdown()
@@ -0,0 +1,105 @@
+import threading
+import itertools
+import uuid
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.preprocess import RECIPE_PATH, load_recipes, clean_recipes
+from utils.recipe_store import load_recipe_store, store_dir_for, source_stat
+
+# free-text columns kept pre-lowercased for the filtering / matching code in ai.recommend
+TEXT_COLUMNS = ['Recipe_name', 'Diet_type', 'Cuisine_type', 'Ingredients', 'ingredients', 'description', 'Description']
+
+_versions = itertools.count(1)
+
+
+class RecipeCatalog:
+    """Cleaned recipe table built once and shared read-only across requests.
+
+    frame: output of clean_recipes (numeric macros, calories, deduplicated names). Treat it as read-only;
+           copy before adding columns.
+    text: column name -> list of lowercased str() values, row-aligned with frame
+    version: unique per build, so caches derived from one catalog never leak into the next
+    fingerprint: identifies the catalog's content across processes and restarts (source path, size and mtime);
+                 catalogs built from a frame in memory get a random one
+    text_codes: optional column name -> (codes, distinct values) from a recipe store; text is then
+                lowercased once per distinct value
+    """
+
+    def __init__(self, frame: pd.DataFrame, source: str = None, text_codes: dict = None, fingerprint: str = None):
+        self.frame = frame
+        self.source = source
+        self.version = next(_versions)
+        self.fingerprint = fingerprint or uuid.uuid4().hex
+        self.text = {}
+        text_codes = text_codes or {}
+        for col in TEXT_COLUMNS:
+            if col in text_codes:
+                codes, table = text_codes[col]
+                # a trailing 'nan' entry stands in for missing values (code -1), as str(NaN) would
+                lowered = np.array([v.lower() for v in table.tolist()] + ['nan'], dtype=object)
+                self.text[col] = lowered[codes].tolist()
+            elif col in frame.columns:
+                self.text[col] = [str(v).lower() for v in frame[col].tolist()]
+        self._derived = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.frame)
+
+    def derived(self, key, build):
+        """Return a structure computed from this catalog, building it on first use.
+
+        Anything cached here (token indexes, masks, shortlists) is dropped together with the catalog on reload.
+        """
+        try:
+            return self._derived[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = build(self)
+            return self._derived[key]
+
+
+def build_catalog(path: str = RECIPE_PATH) -> RecipeCatalog:
+    """Catalog for the CSV at path, read from its columnar store when one is up to date"""
+    stat = source_stat(path)
+    fingerprint = f"{path}:{stat['size']}:{stat['mtime_ns']}" if stat else None
+    stored = load_recipe_store(store_dir_for(path), source_path=path)
+    if stored is not None:
+        frame, text_codes = stored
+        return RecipeCatalog(frame, source=path, text_codes=text_codes, fingerprint=fingerprint)
+    return RecipeCatalog(clean_recipes(load_recipes(path)), source=path, fingerprint=fingerprint)
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog(path: str = RECIPE_PATH) -> RecipeCatalog:
+    """Process-wide catalog, parsed from CSV on first use only."""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = build_catalog(path)
+    return _catalog
+
+
+def loaded_catalog() -> RecipeCatalog:
+    """Process-wide catalog if it has been built, else None (never parses)"""
+    return _catalog
+
+
+def reload_catalog(path: str = None) -> RecipeCatalog:
+    """Rebuild the catalog (e.g. after All_Diets.csv was updated) and swap it in for subsequent requests."""
+    global _catalog
+    with _catalog_lock:
+        if path is None:
+            path = _catalog.source if _catalog is not None else RECIPE_PATH
+        _catalog = build_catalog(path)
+    return _catalog
@@ -52,22 +52,26 @@ def compute_bmr(row: pd.Series) -> float:
 
 
 def compute_daily_needs(df: pd.DataFrame) -> pd.DataFrame:
+    """Add BMR, activity_factor, estimated_daily_calories and target_calories columns.
+
+    Column-wise version of compute_bmr / the activity lookup; a missing Gender counts as male and a
+    missing activity level as sedentary.
+    """
     df = df.copy()
 
-    def activity_factor(level: str) -> float:
-        if pd.isna(level):
-            return 1.2
-        lvl = str(level).strip().lower()
-        if "sedentary" in lvl:
-            return 1.2
-        if "moderate" in lvl:
-            return 1.55
-        if "active" in lvl:
-            return 1.725
-        return 1.375
-
-    df["BMR"] = df.apply(compute_bmr, axis=1)
-    df["activity_factor"] = df["Physical_Activity_Level"].apply(activity_factor)
+    # Mifflin-St Jeor, +5 for male / -161 otherwise
+    gender = df["Gender"] if "Gender" in df.columns else pd.Series("Male", index=df.index)
+    male = gender.where(gender.notna(), "Male").astype(str).str.strip().str.lower().str.startswith('m')
+    df["BMR"] = 10 * df["Weight_kg"] + 6.25 * df["Height_cm"] - 5 * df["Age"] + np.where(male, 5, -161)
+
+    # first matching keyword wins, in the order the levels are checked
+    level = df["Physical_Activity_Level"]
+    lvl = level.astype(str).str.strip().str.lower()
+    df["activity_factor"] = np.select(
+        [level.isna(), lvl.str.contains("sedentary", regex=False), lvl.str.contains("moderate", regex=False), lvl.str.contains("active", regex=False)],
+        [1.2, 1.2, 1.55, 1.725],
+        default=1.375,
+    )
     df["estimated_daily_calories"] = (df["BMR"] * df["activity_factor"]).round(0)
 
     # If Daily_Caloric_Intake present and valid, prefer that
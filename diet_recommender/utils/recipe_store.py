@@ -0,0 +1,151 @@
+"""
+Columnar on-disk copy of the cleaned recipe table.
+
+A store is a directory next to the CSV (All_Diets.csv -> All_Diets.csv.columns/) holding
+- one .npy file per numeric column, loaded memory-mapped so processes share the pages through the OS cache
+- per text column, int32 codes plus a .npy table of the distinct values (-1 = missing)
+- manifest.json describing the columns and the size / mtime of the CSV the store was built from
+
+Build it after updating the CSV:
+    python utils/recipe_store.py [path/to/All_Diets.csv]
+A store that no longer matches its CSV is ignored and the CSV is parsed instead.
+"""
+import json
+import os
+import uuid
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.preprocess import RECIPE_PATH, load_recipes, clean_recipes
+
+STORE_FORMAT = 1
+MANIFEST = 'manifest.json'
+
+
+def store_dir_for(csv_path: str) -> str:
+    return csv_path + '.columns'
+
+
+def source_stat(csv_path: str) -> Optional[dict]:
+    try:
+        st = os.stat(csv_path)
+    except OSError:
+        return None
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def write_recipe_store(frame: pd.DataFrame, store_dir: str, source_path: str = None) -> str:
+    """Write frame (output of clean_recipes) as a columnar store; returns the manifest path.
+
+    Column files get a fresh prefix and the manifest is swapped in last, so a reader never sees a
+    half-written store; files of the previous build are removed afterwards.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    prefix = uuid.uuid4().hex[:12]
+    columns = []
+    written = []
+
+    def save(name, arr):
+        path = os.path.join(store_dir, f'{prefix}-{name}.npy')
+        np.save(path, arr, allow_pickle=False)
+        written.append(os.path.basename(path))
+        return os.path.basename(path)
+
+    save('index', frame.index.to_numpy(dtype=np.int64))
+    for i, col in enumerate(frame.columns):
+        series = frame[col]
+        entry = {'name': col, 'dtype': str(series.dtype)}
+        if series.dtype.kind in 'biuf':
+            entry['kind'] = 'numeric'
+            entry['file'] = save(f'c{i}', series.to_numpy())
+        else:
+            present = series.dropna()
+            if not all(isinstance(v, str) for v in present.tolist()):
+                raise ValueError(f"column {col!r} is neither numeric nor text")
+            codes, uniques = pd.factorize(series)
+            entry['kind'] = 'text'
+            entry['file'] = save(f'c{i}', codes.astype(np.int32))
+            entry['table'] = save(f't{i}', np.asarray(uniques, dtype=str))
+        columns.append(entry)
+
+    manifest = {
+        'format': STORE_FORMAT,
+        'rows': len(frame),
+        'index': f'{prefix}-index.npy',
+        'columns': columns,
+        'source': source_stat(source_path) if source_path else None,
+    }
+    manifest_path = os.path.join(store_dir, MANIFEST)
+    tmp = manifest_path + f'.{prefix}.tmp'
+    with open(tmp, 'w', encoding='utf8') as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(tmp, manifest_path)
+
+    for name in os.listdir(store_dir):
+        if name.endswith('.npy') and name not in written:
+            try:
+                os.remove(os.path.join(store_dir, name))
+            except OSError:
+                # still mapped by a running process (Windows); the next build retries
+                pass
+    return manifest_path
+
+
+def load_recipe_store(store_dir: str, source_path: str = None, mmap: bool = True) -> Optional[Tuple[pd.DataFrame, Dict[str, tuple]]]:
+    """Cleaned recipe frame from a store, or None if there is no usable store.
+
+    With source_path the store is only used while that CSV still has the size / mtime recorded at build time.
+    Returns (frame, text_codes) where text_codes maps each text column to (codes, object array of its
+    distinct values) for callers that want to process every distinct string once.
+    """
+    try:
+        with open(os.path.join(store_dir, MANIFEST), 'r', encoding='utf8') as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('format') != STORE_FORMAT:
+        return None
+    if source_path is not None:
+        current = source_stat(source_path)
+        if current is not None and current != manifest.get('source'):
+            return None
+
+    mode = 'r' if mmap else None
+    try:
+        index = np.load(os.path.join(store_dir, manifest['index']), mmap_mode=mode)
+        data = {}
+        text_codes = {}
+        for entry in manifest['columns']:
+            values = np.load(os.path.join(store_dir, entry['file']), mmap_mode=mode)
+            if entry['kind'] == 'text':
+                names = np.load(os.path.join(store_dir, entry['table'])).tolist()
+                table = np.empty(len(names), dtype=object)
+                table[:] = names
+                codes = np.asarray(values)
+                decoded = table[codes]
+                decoded[codes < 0] = np.nan
+                values = pd.array(decoded, dtype=entry['dtype']) if entry['dtype'] != 'object' else decoded
+                text_codes[entry['name']] = (codes, table)
+            data[entry['name']] = values
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Warning: ignoring unreadable recipe store {store_dir}: {e}")
+        return None
+    # copy=False keeps the numeric columns backed by the mapped files
+    frame = pd.DataFrame(data, index=pd.Index(np.asarray(index)), copy=False)
+    return frame, text_codes
+
+
+def build_recipe_store(csv_path: str = RECIPE_PATH, store_dir: str = None) -> str:
+    """Parse and clean csv_path once and write its columnar store"""
+    store_dir = store_dir or store_dir_for(csv_path)
+    return write_recipe_store(clean_recipes(load_recipes(csv_path)), store_dir, source_path=csv_path)
+
+
+if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else RECIPE_PATH
+    manifest_path = build_recipe_store(csv_path)
+    print(f"Wrote recipe store for {csv_path} to {os.path.dirname(manifest_path)}")